@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # регистрируем фоновые задачи из <app>/tasks.py и фрагменты
+        # страниц из <app>/fragments.py
+        autodiscover_modules('tasks', 'fragments')
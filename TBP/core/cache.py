@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import registry
+
+
+def get_cache_version(scope):
+    """Текущая версия закэшированных данных для области scope.
+
+    Версия входит в ключи кэша, поэтому её увеличение делает все
+    старые записи области недоступными без перебора ключей.
+    """
+    return cache.get_or_set(f'version:{scope}', 1, None) or 1
+
+
+def bump_cache_version(*scopes):
+    """Инвалидирует кэш перечисленных областей."""
+    for scope in scopes:
+        key = f'version:{scope}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def single_flight(key, compute, timeout, stale_key=None, name='default'):
+    """Значение из кэша, которое при промахе вычисляет один воркер.
+
+    Вычисляющий воркер берёт короткую блокировку в кэше, остальные
+    в это время отдают устаревшую копию из stale_key (если она есть)
+    или ждут результат до SINGLE_FLIGHT_WAIT секунд, а затем считают
+    сами. compute может вернуть None — такой результат не кэшируется.
+    Если значение будет готово позже, compute возвращает Pending:
+    блокировка тогда остаётся за воркером до вызова Pending.release().
+    Исходы учитываются в метрике tbp_single_flight_total с меткой name.
+    """
+    value = cache.get(key)
+    if value is not None:
+        registry.increment('single_flight', name, 'hit')
+        return value
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        registry.increment('single_flight', name, 'computed')
+        value = None
+        try:
+            value = compute_and_store(key, compute, timeout, stale_key)
+            return value
+        finally:
+            if isinstance(value, Pending):
+                value.lock_key = lock_key
+            else:
+                cache.delete(lock_key)
+    if stale_key is not None:
+        value = cache.get(stale_key)
+        if value is not None:
+            registry.increment('single_flight', name, 'stale')
+            return value
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL)
+        value = cache.get(key)
+        if value is not None:
+            registry.increment('single_flight', name, 'waited')
+            return value
+        if cache.get(lock_key) is None:
+            break
+    # вычисляющий воркер не успел или упал
+    registry.increment('single_flight', name, 'timeout')
+    return compute_and_store(key, compute, timeout, stale_key)
+
+
+class Pending:
+    """Результат compute, который сохранит в кэш сам вычисляющий код."""
+
+    lock_key = None
+
+    def release(self):
+        """Снимает блокировку single_flight, если она была взята."""
+        if self.lock_key is not None:
+            cache.delete(self.lock_key)
+            self.lock_key = None
+
+
+def compute_and_store(key, compute, timeout, stale_key):
+    value = compute()
+    if value is not None and not isinstance(value, Pending):
+        store(key, value, timeout, stale_key)
+    return value
+
+
+def store(key, value, timeout, stale_key=None):
+    """Сохраняет значение и его копию для single_flight."""
+    cache.set(key, value, timeout)
+    if stale_key is not None:
+        cache.set(stale_key, value, settings.SINGLE_FLIGHT_STALE_TIMEOUT)
@@ -0,0 +1,11 @@
+"""Фрагменты страниц, общие для всего сайта (см. core.page_cache)."""
+from django.template.loader import render_to_string
+
+from .page_cache import fragment
+
+
+@fragment
+def user_menu(request, calls):
+    """Пункты меню шапки, зависящие от входа пользователя."""
+    html = render_to_string('includes/user_menu.html', request=request)
+    return {args: html for args in calls}
@@ -0,0 +1,66 @@
+"""Групповая фиксация записей.
+
+Потоки процесса, которым нужно записать по одному объекту, собираются
+в пачку: первый поток пачки (ведущий) ждёт до max_delay секунд или
+пока в пачке не наберётся max_size объектов, затем записывает всю
+пачку одной транзакцией. Остальные потоки ждут, пока он закончит.
+submit() возвращается только после фиксации, поэтому записанное видно
+сразу после ответа, а при падении процесса теряются лишь запросы,
+которые ещё не получили ответа.
+"""
+import threading
+
+
+class GroupCommitError(Exception):
+    """Пачка не записана; исходная ошибка — в __cause__."""
+
+
+class Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.errors = None
+        self.error = None
+
+
+class GroupCommit:
+    def __init__(self, write):
+        """write(items) записывает список объектов одной транзакцией
+        и возвращает None или список ошибок по объектам."""
+        self.write = write
+        self.lock = threading.Lock()
+        self.batch = None
+
+    def submit(self, item, max_size, max_delay):
+        """Записывает item вместе с объектами других потоков."""
+        with self.lock:
+            batch = self.batch
+            leader = batch is None
+            if leader:
+                batch = self.batch = Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= max_size:
+                batch.full.set()
+                self.batch = None
+        if not leader:
+            batch.done.wait()
+        else:
+            batch.full.wait(max_delay)
+            with self.lock:
+                if self.batch is batch:
+                    self.batch = None
+            try:
+                batch.errors = self.write(batch.items)
+            except Exception as error:
+                batch.error = error
+            finally:
+                batch.done.set()
+        if batch.error is not None:
+            # у каждого потока своё исключение со своей трассировкой
+            raise GroupCommitError(
+                f'Пачка из {len(batch.items)} объектов не записана'
+            ) from batch.error
+        if batch.errors and batch.errors[index] is not None:
+            raise batch.errors[index]
@@ -0,0 +1,101 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (Linux) или его пик (остальные ОС)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def fetch(client, url):
+    """Запрос страницы: ответ, длина, время до первого байта и прирост RSS.
+
+    Потоковый ответ читается по частям без накопления, обычный
+    доступен целиком только после рендера всей страницы.
+    """
+    rss_before = current_rss()
+    started = time.perf_counter()
+    response = client.get(url)
+    if not response.streaming:
+        ttfb = time.perf_counter() - started
+        return response, len(response.content), ttfb, \
+            current_rss() - rss_before
+    ttfb, length, rss_peak = None, 0, rss_before
+    for chunk in response.streaming_content:
+        if ttfb is None and chunk:
+            ttfb = time.perf_counter() - started
+        length += len(chunk)
+        rss_peak = max(rss_peak, current_rss())
+    response.close()
+    return response, length, ttfb or 0, rss_peak - rss_before
+
+
+class Command(BaseCommand):
+    help = ('Замер страниц: размер ответа, число и время SQL-запросов, '
+            'пик выделенной памяти и RSS, время до первого байта '
+            'и время ответа.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=['/'])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--user', help='Выполнять запросы от имени этого пользователя.'
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Сравнить обычный и потоковый рендер (STREAM_PAGES) '
+                 'при выключенном кэше страниц.'
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            from django.contrib.auth import get_user_model
+            client.force_login(
+                get_user_model().objects.get(username=options['user'])
+            )
+        for url in options['urls']:
+            if not options['compare']:
+                self.bench(client, url, options['repeat'])
+                continue
+            for stream in (False, True):
+                with override_settings(
+                        STREAM_PAGES=stream, PAGE_CACHE_TIMEOUT=0):
+                    self.bench(
+                        client, url, options['repeat'],
+                        'потоковый' if stream else 'обычный'
+                    )
+
+    def bench(self, client, url, repeat, mode=''):
+        fetch(client, url)
+        durations, ttfbs, peaks, rss = [], [], [], []
+        for _ in range(repeat):
+            tracemalloc.start()
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response, length, ttfb, rss_delta = fetch(client, url)
+            durations.append(time.perf_counter() - started)
+            ttfbs.append(ttfb)
+            rss.append(rss_delta)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        sql_time = sum(float(query['time']) for query in queries)
+        label = f'{url} ({mode})' if mode else url
+        self.stdout.write(
+            f'{label}: {response.status_code}, {length} байт, '
+            f'{len(queries)} запросов ({sql_time * 1000:.1f} мс), '
+            f'пик памяти {max(peaks) / 1024:.0f} КБ, '
+            f'прирост RSS {max(rss) / 1024:.0f} КБ, '
+            f'первый байт {sum(ttfbs) / len(ttfbs) * 1000:.1f} мс, '
+            f'среднее время {sum(durations) / len(durations) * 1000:.1f} мс'
+        )
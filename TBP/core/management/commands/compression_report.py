@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = 'Размер страницы в байтах без сжатия и со сжатием.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=['/'])
+
+    def handle(self, *args, **options):
+        client = Client()
+        for url in options['urls']:
+            plain = client.get(url)
+            self.stdout.write(f'{url}: {len(plain.content)} байт без сжатия')
+            for encoding in ('gzip', 'br'):
+                response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                if (response.get('Content-Encoding') != encoding
+                        or not plain.content):
+                    continue
+                ratio = len(response.content) / len(plain.content)
+                self.stdout.write(
+                    f'{url}: {len(response.content)} байт {encoding} '
+                    f'({ratio:.0%})'
+                )
@@ -0,0 +1,99 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiler import category, make_token, read_profile
+
+
+def load_profiles(view=None):
+    """Стеки, число профилей и суммарное время по представлениям."""
+    views = {}
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return views
+    for directory in sorted(os.listdir(settings.PROFILE_DIR)):
+        path = os.path.join(settings.PROFILE_DIR, directory)
+        if not os.path.isdir(path):
+            continue
+        for name in os.listdir(path):
+            if not name.endswith('.collapsed'):
+                continue
+            header, stacks = read_profile(os.path.join(path, name))
+            view_name = header.get('view') or directory
+            if view is not None and view_name != view:
+                continue
+            total = views.setdefault(
+                view_name, {'profiles': 0, 'duration': 0.0, 'stacks': {}}
+            )
+            total['profiles'] += 1
+            total['duration'] += float(header.get('duration', 0))
+            for stack, count in stacks.items():
+                total['stacks'][stack] = total['stacks'].get(stack, 0) + count
+    return views
+
+
+class Command(BaseCommand):
+    help = ('Сводка профилей запросов по представлениям: куда уходит '
+            'время (SQL, шаблоны, миниатюры, Python) и самые частые '
+            'функции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help='Только это представление.')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--collapsed', action='store_true',
+            help='Вывести объединённые стеки для flamegraph.pl '
+                 'или speedscope.'
+        )
+        parser.add_argument(
+            '--token', action='store_true',
+            help='Вывести значение заголовка X-Profile для '
+                 'профилирования своего запроса.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Удалить все профили.'
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(make_token())
+            return
+        if options['clear']:
+            shutil.rmtree(settings.PROFILE_DIR, ignore_errors=True)
+            return
+        views = load_profiles(options['view'])
+        if options['collapsed']:
+            merged = {}
+            for total in views.values():
+                for stack, count in total['stacks'].items():
+                    merged[stack] = merged.get(stack, 0) + count
+            for stack, count in sorted(merged.items()):
+                self.stdout.write(f'{stack} {count}')
+            return
+        for view, total in sorted(
+                views.items(), key=lambda item: -item[1]['duration']):
+            self.report(view, total, options['limit'])
+
+    def report(self, view, total, limit):
+        samples = sum(total['stacks'].values()) or 1
+        categories, own = {}, {}
+        for stack, count in total['stacks'].items():
+            name = category(stack)
+            categories[name] = categories.get(name, 0) + count
+            leaf = stack.rsplit(';', 1)[-1]
+            own[leaf] = own.get(leaf, 0) + count
+        average = total['duration'] / total['profiles']
+        self.stdout.write(
+            f'{view}: {total["profiles"]} профилей, среднее время '
+            f'{average * 1000:.1f} мс, {samples} снимков'
+        )
+        self.stdout.write('    ' + ', '.join(
+            f'{name} {count / samples:.0%}'
+            for name, count in sorted(
+                categories.items(), key=lambda item: -item[1]
+            )
+        ))
+        for leaf, count in sorted(
+                own.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'    {count / samples:6.1%}  {leaf}')
@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Count
+
+from core.models import Task
+from core.tasks import WorkerMetrics, claim_tasks, prune_tasks, run_task
+
+# как часто (в секундах) удалять давно завершённые задачи
+PRUNE_INTERVAL = 60 * 60
+
+
+def run_task_and_close(pk):
+    try:
+        return run_task(pk)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Воркер фоновой очереди задач. Без него (и без TASKS_EAGER) '
+            'задачи не выполняются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Размер пула потоков или процессов.'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Выполнять задачи в пуле процессов вместо потоков.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать состояние очереди и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+        workers = options['workers']
+        processes = options['processes']
+        if processes:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        metrics = WorkerMetrics()
+        pruned_at = None
+        with executor:
+            while True:
+                claimed = claim_tasks(limit=workers * 2)
+                if not claimed:
+                    # чистим таблицу, пока очередь пуста
+                    if (pruned_at is None or time.monotonic() - pruned_at
+                            > PRUNE_INTERVAL):
+                        prune_tasks()
+                        pruned_at = time.monotonic()
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                if processes:
+                    # соединения не должны наследоваться дочерними процессами
+                    connections.close_all()
+                for result in executor.map(run_task_and_close, claimed):
+                    metrics.record(*result)
+                self.stdout.write(str(metrics))
+        self.stdout.write(str(metrics))
+
+    def print_stats(self):
+        counts = Task.objects.values('status').annotate(total=Count('pk'))
+        for row in counts.order_by('status'):
+            self.stdout.write(f"{row['status']}: {row['total']}")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+ORDERING = {
+    'total': '-total_time',
+    'max': '-max_time',
+    'count': '-count',
+}
+
+
+class Command(BaseCommand):
+    help = 'Самые медленные SQL-запросы из журнала.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--order', choices=ORDERING, default='total',
+            help='Сортировка: по суммарному, максимальному времени '
+                 'или количеству.'
+        )
+        parser.add_argument(
+            '--show', type=int, metavar='ID',
+            help='Показать запрос целиком с параметрами и планом.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить журнал.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            SlowQuery.objects.all().delete()
+            return
+        if options['show'] is not None:
+            return self.show(SlowQuery.objects.get(pk=options['show']))
+        queries = SlowQuery.objects.order_by(ORDERING[options['order']])
+        for query in queries[:options['limit']]:
+            average = query.total_time / query.count
+            self.stdout.write(
+                f'#{query.pk} {query.total_time:.3f} с всего, '
+                f'{query.count} раз, среднее {average * 1000:.1f} мс, '
+                f'максимум {query.max_time * 1000:.1f} мс, {query.view}\n'
+                f'    {query.sql[:200]}'
+            )
+
+    def show(self, query):
+        self.stdout.write(
+            f'{query.sql}\n\nПараметры: {query.params}\n'
+            f'Представление: {query.view}\n\nПлан:\n{query.plan}'
+        )
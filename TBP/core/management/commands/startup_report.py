@@ -0,0 +1,89 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+re_import_time = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$'
+)
+
+STARTUP_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import tbp.wsgi as wsgi
+print(json.dumps({
+    'total': time.perf_counter() - started,
+    'setup': wsgi.setup_duration,
+    'warmup': getattr(wsgi, 'warmup_report', []),
+}))
+'''
+
+
+def parse_import_times(lines):
+    """Вывод python -X importtime: [(модуль, своё время, время вместе
+    с зависимостями), ...] в секундах."""
+    modules = []
+    for line in lines:
+        match = re_import_time.match(line)
+        if match:
+            own, cumulative, name = match.groups()
+            modules.append((name, int(own) / 1e6, int(cumulative) / 1e6))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Отчёт о запуске воркера: время импорта модулей, настройки '
+            'Django и шагов прогрева (WARM_START).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=15)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Запуск без прогрева, для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        environment = dict(
+            os.environ, WARM_START='0' if options['cold'] else '1'
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=environment,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True
+        )
+        startup = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_import_times(result.stderr.splitlines())
+        limit = options['limit']
+
+        self.stdout.write(
+            f'Импорт tbp.wsgi: {startup["total"]:.3f} с, из них '
+            f'настройка Django {startup["setup"]:.3f} с'
+        )
+        for name, count, duration in startup['warmup']:
+            self.stdout.write(
+                f'    прогрев: {name} — {count} за {duration:.3f} с'
+            )
+
+        packages = {}
+        for name, own, _ in modules:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + own
+        self.stdout.write(
+            f'\nИмпорт модулей: {len(modules)}, '
+            f'{sum(own for _, own, _ in modules):.3f} с. '
+            f'Пакеты по собственному времени импорта:'
+        )
+        for package, own in sorted(
+                packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'    {own:7.3f} с  {package}')
+
+        self.stdout.write('\nМодули по времени импорта вместе с '
+                          'зависимостями:')
+        for name, _, cumulative in sorted(
+                modules, key=lambda module: -module[2])[:limit]:
+            self.stdout.write(f'    {cumulative:7.3f} с  {name}')
@@ -0,0 +1,196 @@
+"""Метрики запросов по именам представлений в формате Prometheus.
+
+Каждый процесс копит счётчики в памяти и периодически сбрасывает их
+в свой файл в METRICS_DIR. Представление /metrics складывает файлы
+всех процессов, поэтому метрики видны независимо от того, какой
+воркер обслужил запрос.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def new_entry():
+    return {
+        'count': 0,
+        'duration_sum': 0.0,
+        'duration_buckets': [0] * len(settings.METRICS_BUCKETS),
+        'size_sum': 0,
+        'queries_sum': 0,
+        'queries_buckets': [0] * len(QUERY_BUCKETS),
+    }
+
+
+def bucket_index(buckets, value):
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.counters = {}
+        self.last_flush = time.monotonic()
+
+    def observe(self, view, method, status, duration, size, queries):
+        key = (view, method, str(status))
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                entry = self.data[key] = new_entry()
+            entry['count'] += 1
+            entry['duration_sum'] += duration
+            index = bucket_index(settings.METRICS_BUCKETS, duration)
+            if index is not None:
+                entry['duration_buckets'][index] += 1
+            entry['size_sum'] += size
+            entry['queries_sum'] += queries
+            index = bucket_index(QUERY_BUCKETS, queries)
+            if index is not None:
+                entry['queries_buckets'][index] += 1
+        self.maybe_flush()
+
+    def increment(self, name, *labels):
+        """Увеличивает простой счётчик name с метками labels."""
+        key = (name,) + labels
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        elapsed = time.monotonic() - self.last_flush
+        if elapsed > settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Сохраняет счётчики процесса в его файл (атомарно)."""
+        with self.lock:
+            self.last_flush = time.monotonic()
+            data = {
+                'requests': [
+                    [list(key), entry] for key, entry in self.data.items()
+                ],
+                'counters': [
+                    [list(key), value]
+                    for key, value in self.counters.items()
+                ],
+            }
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as output:
+            json.dump(data, output)
+        os.replace(temporary, path)
+
+
+registry = MetricsRegistry()
+
+
+def collect():
+    """Складывает счётчики всех процессов.
+
+    Возвращает метрики запросов по представлениям и простые счётчики.
+    """
+    registry.flush()
+    merged = {}
+    counters = {}
+    for name in os.listdir(settings.METRICS_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as source:
+                data = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for key, value in data['counters']:
+            key = tuple(key)
+            counters[key] = counters.get(key, 0) + value
+        for key, entry in data['requests']:
+            key = tuple(key)
+            total = merged.get(key)
+            if total is None:
+                merged[key] = entry
+                continue
+            for field, value in entry.items():
+                if isinstance(value, list):
+                    total[field] = [a + b for a, b in zip(total[field], value)]
+                else:
+                    total[field] += value
+    return merged, counters
+
+
+def render_histogram(lines, name, labels, buckets, counts, total, count):
+    cumulative = 0
+    for bound, bucket_count in zip(buckets, counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {total}')
+    lines.append(f'{name}_count{{{labels}}} {count}')
+
+
+COUNTERS = {
+    'single_flight': (
+        'Обращения к кэшу с защитой от одновременного пересчёта.',
+        ('name', 'outcome'),
+    ),
+}
+
+
+def render_prometheus(merged, counters=None):
+    """Текстовый формат Prometheus (exposition format 0.0.4)."""
+    lines = [
+        '# HELP tbp_request_duration_seconds Время обработки запроса.',
+        '# TYPE tbp_request_duration_seconds histogram',
+    ]
+    items = sorted(merged.items())
+    for (view, method, status), entry in items:
+        labels = f'view="{view}",method="{method}",status="{status}"'
+        render_histogram(
+            lines, 'tbp_request_duration_seconds', labels,
+            settings.METRICS_BUCKETS, entry['duration_buckets'],
+            entry['duration_sum'], entry['count']
+        )
+    lines += [
+        '# HELP tbp_db_queries SQL-запросов на один HTTP-запрос.',
+        '# TYPE tbp_db_queries histogram',
+    ]
+    for (view, method, status), entry in items:
+        labels = f'view="{view}",method="{method}",status="{status}"'
+        render_histogram(
+            lines, 'tbp_db_queries', labels, QUERY_BUCKETS,
+            entry['queries_buckets'], entry['queries_sum'], entry['count']
+        )
+    lines += [
+        '# HELP tbp_response_size_bytes Размер тела ответа.',
+        '# TYPE tbp_response_size_bytes summary',
+    ]
+    for (view, method, status), entry in items:
+        labels = f'view="{view}",method="{method}",status="{status}"'
+        lines.append(f'tbp_response_size_bytes_sum{{{labels}}} '
+                     f'{entry["size_sum"]}')
+        lines.append(f'tbp_response_size_bytes_count{{{labels}}} '
+                     f'{entry["count"]}')
+    counters = counters or {}
+    for name, (description, label_names) in COUNTERS.items():
+        lines += [
+            f'# HELP tbp_{name}_total {description}',
+            f'# TYPE tbp_{name}_total counter',
+        ]
+        for key, value in sorted(counters.items()):
+            if key[0] != name:
+                continue
+            labels = ','.join(
+                f'{label}="{label_value}"'
+                for label, label_value in zip(label_names, key[1:])
+            )
+            lines.append(f'tbp_{name}_total{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,94 @@
+import gzip
+import io
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from ..storage import accepts_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/rss+xml',
+    'application/atom+xml',
+    'image/svg+xml',
+)
+
+
+def compress_sequence(sequence):
+    """Сжимает поток gzip, отдавая сжатые данные после каждой части.
+
+    В отличие от django.utils.text.compress_sequence буфер сбрасывается
+    на каждой части, поэтому начало потоковой страницы доходит до
+    клиента сразу, а не после накопления блока сжатых данных.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(mode='wb', compresslevel=6, fileobj=buffer) as zfile:
+        for item in sequence:
+            zfile.write(item)
+            zfile.flush()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает текстовые ответы алгоритмом brotli или gzip.
+
+    Не трогает ответы меньше COMPRESS_MIN_SIZE байт, ответы с уже
+    заданным Content-Encoding, уже сжатые форматы (картинки, архивы)
+    и файлы, отдаваемые по диапазонам: сжатие сломало бы Content-Range
+    и отдачу через sendfile.
+    """
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if (response.status_code == 206
+                or response.has_header('Content-Range')
+                or response.has_header('Accept-Ranges')):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESS_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (brotli is not None and not response.streaming
+                and accepts_encoding(accept_encoding, 'br')):
+            encoding, compress = 'br', brotli.compress
+        elif accepts_encoding(accept_encoding, 'gzip'):
+            encoding, compress = 'gzip', compress_string
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed_content = compress(response.content)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,37 @@
+import time
+
+from django.db import connection
+
+from core.metrics import registry
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Время ответа, статус, размер ответа и число SQL-запросов
+    по имени URL (posts:index, about:author и т. д.)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(
+            view, request.method, response.status_code, duration, size,
+            counter.count
+        )
+        return response
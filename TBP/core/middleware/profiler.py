@@ -0,0 +1,58 @@
+import random
+import threading
+
+from django.conf import settings
+
+from core.profiler import StackSampler, check_token, save_profile
+
+
+def profile_requested(request):
+    """Профилировать запрос: по подписанному заголовку X-Profile,
+    параметру ?profile для сотрудников или случайной выборке."""
+    token = request.META.get('HTTP_X_PROFILE')
+    if token and check_token(token):
+        return True
+    if 'profile' in request.GET:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+    return random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+class ProfilerMiddleware:
+    """Снимает профиль выбранных запросов (core.profiler).
+
+    Имя файла профиля возвращается в заголовке X-Profile-Id. Для
+    потоковых ответов профиль снимается до конца отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request):
+            return self.get_response(request)
+        sampler = StackSampler(threading.get_ident()).start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            sampler.stop()
+            raise
+        if response.streaming:
+            response.streaming_content = self.sample_stream(
+                request, sampler, response.streaming_content
+            )
+            return response
+        response['X-Profile-Id'] = self.save(request, sampler.stop())
+        return response
+
+    def sample_stream(self, request, sampler, chunks):
+        try:
+            yield from chunks
+        finally:
+            self.save(request, sampler.stop())
+
+    @staticmethod
+    def save(request, sampler):
+        match = getattr(request, 'resolver_match', None)
+        return save_profile(sampler, match.view_name if match else '')
@@ -0,0 +1,15 @@
+from django.db import connection
+
+from core.slow_queries import SlowQueryLogger
+
+
+class SlowQueryMiddleware:
+    """Записывает SQL-запросы дольше SLOW_QUERY_THRESHOLD секунд
+    вместе с представлением, которое их выполнило."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
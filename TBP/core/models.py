@@ -0,0 +1,70 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенная задача фоновой очереди."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы (JSON)', default='[[], {}]')
+    dedupe_key = models.CharField(
+        'Ключ дедупликации',
+        max_length=200,
+        blank=True,
+        null=True
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=3)
+    run_at = models.DateTimeField('Запустить после', default=timezone.now)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    started = models.DateTimeField('Начало', blank=True, null=True)
+    finished = models.DateTimeField('Окончание', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        constraints = [
+            # одинаковая задача не может стоять в очереди дважды
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='pending'),
+                name='unique_pending_dedupe_key'
+            ),
+        ]
+
+
+class SlowQuery(models.Model):
+    """Медленный SQL-запрос, сгруппированный по нормализованному тексту."""
+    fingerprint = models.CharField('Отпечаток', max_length=40, unique=True)
+    sql = models.TextField('Пример запроса')
+    params = models.TextField('Параметры примера', blank=True)
+    view = models.CharField('Представление', max_length=200, blank=True)
+    plan = models.TextField('План запроса', blank=True)
+    count = models.PositiveIntegerField('Количество', default=1)
+    total_time = models.FloatField('Суммарное время, с', default=0)
+    max_time = models.FloatField('Максимальное время, с', default=0)
+    first_seen = models.DateTimeField('Впервые', auto_now_add=True)
+    last_seen = models.DateTimeField('Последний раз', auto_now=True)
+
+    def __str__(self):
+        return self.sql[:50]
@@ -0,0 +1,206 @@
+"""Общий кэш страниц для всех пользователей.
+
+Страница рендерится один раз без данных конкретного пользователя:
+на месте тегов {% personal %} остаются метки. При каждом ответе метки
+заменяются фрагментами текущего пользователя (кнопка подписки, ссылка
+редактирования, форма с CSRF-токеном, меню в шапке). Функция фрагмента
+получает сразу все метки своего вида на странице, поэтому, например,
+состояние подписок определяется одним запросом.
+"""
+import re
+from functools import wraps
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .cache import Pending, get_cache_version, single_flight, store
+
+re_marker = re.compile(r'<!--personal:([\w-]+)((?::[^:>\s]*)*)-->')
+
+fragments = {}
+
+
+def fragment(func):
+    """Регистрирует функцию фрагмента под её именем.
+
+    Функция принимает запрос и список кортежей аргументов (строк)
+    и возвращает словарь {аргументы: html}.
+    """
+    fragments[func.__name__] = func
+    return func
+
+
+def make_marker(name, args):
+    return '<!--personal:%s%s-->' % (
+        name, ''.join(':' + quote(str(arg), safe='') for arg in args)
+    )
+
+
+def render_fragment(request, name, args):
+    """Фрагмент для одной метки, без общего кэша."""
+    args = tuple(str(arg) for arg in args)
+    return fragments[name](request, [args])[args]
+
+
+def personalize(content, request):
+    """Заменяет метки в тексте страницы фрагментами пользователя."""
+    calls = {}
+    for name, args in re_marker.findall(content):
+        args = tuple(unquote(arg) for arg in args.split(':')[1:])
+        calls.setdefault(name, set()).add(args)
+    rendered = {
+        name: fragments[name](request, list(args))
+        for name, args in calls.items()
+    }
+
+    def replace(match):
+        args = tuple(unquote(arg) for arg in match.group(2).split(':')[1:])
+        return rendered[match.group(1)][args]
+
+    return re_marker.sub(replace, content)
+
+
+def page_number(request):
+    """Номер страницы из параметра page; 1, если это не число."""
+    try:
+        return int(request.GET.get('page', 1))
+    except ValueError:
+        return 1
+
+
+def page_path(request):
+    """Путь страницы для ключа кэша.
+
+    Из параметров запроса учитывается только номер страницы, иначе
+    произвольные параметры плодили бы копии одной и той же страницы.
+    """
+    number = page_number(request)
+    return request.path if number == 1 else f'{request.path}?page={number}'
+
+
+def page_key(request, scopes):
+    versions = '.'.join(
+        str(get_cache_version(scope)) for scope in ('pages',) + scopes
+    )
+    return f'page:{page_path(request)}:{versions}'
+
+
+def cacheable(request):
+    """Не показана ли вместо запрошенной другая страница ленты.
+
+    Представление с пагинацией записывает в request.page_number номер
+    показанной страницы; номера за концом ленты не кэшируются.
+    """
+    return getattr(request, 'page_number', 1) == page_number(request)
+
+
+def load_personal_state(request):
+    """Загружает пользователя и CSRF-токен до отдачи потоковой страницы.
+
+    Фрагменты потоковой страницы рендерятся уже после middleware,
+    и те не узнали бы, что ответ зависит от сессии (Vary: Cookie)
+    и что нужна cookie с CSRF-токеном.
+    """
+    # пользователь читается из сессии, это помечает её использованной
+    request.user.is_authenticated
+    get_token(request)
+
+
+def stream_and_store(request, chunks, charset, pending, key, timeout,
+                     stale_key):
+    """Отдаёт потоковую страницу по частям и сохраняет её общую копию.
+
+    Части рендерятся лениво, при переборе, поэтому режим общей копии
+    включается на время получения каждой части. Если передан pending,
+    копия сохраняется, когда страница отдана целиком, и только после
+    этого снимается блокировка single_flight.
+    """
+    parts = []
+    chunks = iter(chunks)
+    try:
+        while True:
+            request.shared_page = True
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                request.shared_page = False
+            chunk = chunk.decode(charset)
+            parts.append(chunk)
+            yield personalize(chunk, request).encode(charset)
+        if pending is not None:
+            store(key, ''.join(parts), timeout, stale_key)
+    finally:
+        if pending is not None:
+            pending.release()
+
+
+def shared_page(*scopes):
+    """Кэширует GET-ответ представления, общий для всех пользователей.
+
+    В scopes указываются области версий кэша (см. core.cache), от
+    которых зависит страница; в них подставляются аргументы
+    представления: shared_page('feed'), shared_page('post:{post_id}').
+    Вместо строки можно передать функцию, которая по аргументам
+    представления вернёт область или None, если кэш не нужен.
+    Страницу после промаха рендерит один воркер, остальные получают
+    предыдущую копию (см. core.cache.single_flight).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if request.method != 'GET' or not timeout:
+                return view(request, *args, **kwargs)
+            names = tuple(
+                scope(**kwargs) if callable(scope) else scope.format(**kwargs)
+                for scope in scopes
+            )
+            if None in names:
+                return view(request, *args, **kwargs)
+            key = page_key(request, names)
+            rendered = []
+
+            def render_page():
+                request.shared_page = True
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    # страницы ошибок рендерятся уже без меток
+                    request.shared_page = False
+                rendered.append(response)
+                if response.status_code != 200 or not cacheable(request):
+                    return None
+                if response.streaming:
+                    # копию сохранит stream_and_store после отдачи
+                    return Pending()
+                return response.content.decode(response.charset)
+
+            stale_key = f'page:stale:{page_path(request)}'
+            content = single_flight(
+                key, render_page, timeout, stale_key=stale_key, name='page'
+            )
+            if not rendered:
+                response = HttpResponse(personalize(content, request))
+                response['X-Page-Cache'] = 'hit'
+                return response
+            response = rendered[0]
+            if response.streaming:
+                load_personal_state(request)
+                if response.status_code == 200:
+                    response.streaming_content = stream_and_store(
+                        request, response.streaming_content,
+                        response.charset, content, key, timeout, stale_key
+                    )
+                return response
+            if content is None:
+                content = response.content.decode(response.charset)
+            else:
+                response['X-Page-Cache'] = 'miss'
+            response.content = personalize(content, request)
+            return response
+        return wrapper
+    return decorator
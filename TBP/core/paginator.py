@@ -0,0 +1,139 @@
+from math import ceil
+
+from django.conf import settings
+from django.core.paginator import Paginator, Page, EmptyPage, PageNotAnInteger
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .cache import single_flight
+
+
+def estimate_row_count(model, using='default'):
+    """Приблизительное число строк таблицы без полного COUNT(*)."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table],
+            )
+        else:
+            # Для SQLite: максимальный первичный ключ берётся из индекса
+            # и совпадает с числом строк, пока из таблицы мало удаляли.
+            pk_column = connection.ops.quote_name(model._meta.pk.column)
+            cursor.execute(
+                f'SELECT MAX({pk_column}) '
+                f'FROM {connection.ops.quote_name(table)}'
+            )
+        row = cursor.fetchone()
+    return max(int(row[0] or 0), 0) if row else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который для нефильтрованной выборки берёт оценку
+    числа строк из статистики базы вместо COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+        return estimate_row_count(self.object_list.model, self.object_list.db)
+
+
+class WindowedPage(Page):
+    """Страница, которая знает о следующей странице по самим строкам,
+    а не по общему числу объектов."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    @property
+    def last_page_number(self):
+        return max(
+            self.paginator.num_pages, self.number + int(self._has_next)
+        )
+
+    @property
+    def window(self):
+        """Номера страниц вокруг текущей, первая и последняя.
+
+        None обозначает пропуск в нумерации.
+        """
+        on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+        last = self.last_page_number
+        numbers = {1, last}
+        numbers.update(range(
+            max(self.number - on_each_side, 1),
+            min(self.number + on_each_side, last) + 1
+        ))
+        window, previous = [], 0
+        for number in sorted(numbers):
+            if number - previous > 1:
+                window.append(None)
+            window.append(number)
+            previous = number
+        return window
+
+
+class WindowedPaginator(Paginator):
+    """Пагинатор для лент с большим числом постов.
+
+    Общее число объектов берётся из кэша по ключу count_key (его
+    обновление — дело инвалидации кэша или истечения срока), а
+    содержимое страницы и наличие следующей определяются выборкой
+    per_page + 1 строк, поэтому устаревшее число не искажает страницу.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return single_flight(
+            self.count_key,
+            lambda: Paginator.count.func(self),
+            settings.PAGINATOR_COUNT_TIMEOUT,
+            name='count'
+        )
+
+    @cached_property
+    def num_pages(self):
+        return max(ceil(self.count / self.per_page), 1)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('На странице нет объектов')
+        has_next = len(rows) > self.per_page
+        return WindowedPage(rows[:self.per_page], number, self, has_next)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            pass
+        try:
+            return self.page(self.num_pages)
+        except EmptyPage:
+            # общее число устарело и последней страницы уже нет
+            return self.page(1)
@@ -0,0 +1,140 @@
+"""Выборочное профилирование запросов.
+
+Отдельный поток с интервалом PROFILE_INTERVAL снимает стек потока,
+обрабатывающего запрос, и считает одинаковые стеки. Результат
+сохраняется в формате collapsed stacks (строка «кадр;кадр;кадр N»),
+который понимают flamegraph.pl, speedscope и inferno.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.template.base import Template
+
+SIGNING_SALT = 'core.profiler'
+
+re_unsafe = re.compile(r'[^\w.-]+')
+
+# кадры, по которым видно, куда ушло время
+CATEGORIES = (
+    ('django.db.', 'SQL и ORM'),
+    ('template:', 'шаблоны'),
+    ('django.template.', 'шаблоны'),
+    ('sorl.', 'миниатюры'),
+    ('PIL.', 'миниатюры'),
+)
+
+
+def frame_label(frame):
+    """Имя кадра: модуль:функция, для рендера шаблона — его имя."""
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    if module == 'django.template.base' and code.co_name == 'render':
+        template = frame.f_locals.get('self')
+        if isinstance(template, Template) and template.origin:
+            return f'template:{template.origin.template_name}'
+    return f'{module}:{code.co_name}'
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """Снимает стек потока thread_id, пока не вызван stop()."""
+
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = interval or settings.PROFILE_INTERVAL
+        self.stacks = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = collapse(frame)
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+
+def save_profile(sampler, view):
+    """Сохраняет профиль в PROFILE_DIR/<представление>/, возвращает имя."""
+    directory = os.path.join(
+        settings.PROFILE_DIR, re_unsafe.sub('-', view) or 'unresolved'
+    )
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-' \
+           f'{uuid.uuid4().hex[:8]}.collapsed'
+    with open(os.path.join(directory, name), 'w') as output:
+        output.write(f'# view={view} duration={sampler.duration:.4f} '
+                     f'samples={sampler.samples}\n')
+        for stack, count in sorted(sampler.stacks.items()):
+            output.write(f'{stack} {count}\n')
+    return name
+
+
+def make_token():
+    """Значение заголовка X-Profile, действующее PROFILE_TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def check_token(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def read_profile(path):
+    """Заголовок и стеки сохранённого профиля."""
+    header, stacks = {}, {}
+    with open(path) as source:
+        for line in source:
+            line = line.rstrip('\n')
+            if line.startswith('#'):
+                header = dict(
+                    item.split('=', 1) for item in line[1:].split()
+                    if '=' in item
+                )
+                continue
+            stack, _, count = line.rpartition(' ')
+            if stack:
+                stacks[stack] = stacks.get(stack, 0) + int(count)
+    return header, stacks
+
+
+def category(stack):
+    """К какой части работы относится стек (по самому глубокому
+    узнаваемому кадру)."""
+    for label in reversed(stack.split(';')):
+        for prefix, name in CATEGORIES:
+            if label.startswith(prefix):
+                return name
+    return 'Python'
@@ -0,0 +1,107 @@
+"""Журнал медленных SQL-запросов с планом выполнения."""
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+re_strings = re.compile(r"'(?:[^']|'')*'")
+re_numbers = re.compile(r'\b\d+(?:\.\d+)?\b')
+re_in_lists = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+re_spaces = re.compile(r'\s+')
+
+_state = threading.local()
+
+
+def normalize_sql(sql):
+    """Текст запроса без литералов, чтобы одинаковые запросы совпадали."""
+    sql = re_strings.sub('?', sql)
+    sql = re_numbers.sub('?', sql)
+    sql = re_in_lists.sub('IN (...)', sql)
+    return re_spaces.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()
+
+
+def explain(sql, params):
+    """План выполнения запроса или пустая строка."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+    except Exception:
+        logger.debug('Не удалось получить план запроса', exc_info=True)
+        return ''
+
+
+def record(sql, params, duration, view=''):
+    """Сохраняет медленный запрос, объединяя его с такими же."""
+    key = fingerprint(sql)
+    logger.warning('Медленный запрос (%.3f с, %s): %s', duration, view, sql)
+    updated = SlowQuery.objects.filter(fingerprint=key).update(
+        count=F('count') + 1,
+        total_time=F('total_time') + duration,
+        max_time=Greatest('max_time', Value(duration, FloatField())),
+        last_seen=timezone.now(),
+    )
+    if not updated:
+        SlowQuery.objects.get_or_create(
+            fingerprint=key,
+            defaults={
+                'sql': sql,
+                'params': repr(params),
+                'view': view,
+                'plan': explain(sql, params),
+                'total_time': duration,
+                'max_time': duration,
+            }
+        )
+
+
+class SlowQueryLogger:
+    """Обёртка выполнения запросов для connection.execute_wrapper."""
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_state, 'recording', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= settings.SLOW_QUERY_THRESHOLD and not many:
+                self.save(sql, params, duration)
+
+    def save(self, sql, params, duration):
+        match = getattr(self.request, 'resolver_match', None)
+        _state.recording = True
+        try:
+            record(sql, params, duration, match.view_name if match else '')
+        except Exception:
+            logger.exception('Не удалось сохранить медленный запрос')
+        finally:
+            _state.recording = False
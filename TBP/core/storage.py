@@ -0,0 +1,87 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.txt', '.html', '.xml', '.json', '.ico',
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем в имени файла и заранее сжатыми копиями.
+
+    При collectstatic рядом с каждым текстовым файлом сохраняются
+    варианты .gz и, если установлен пакет brotli, .br.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # До collectstatic (тесты, локальный запуск) файла в
+            # STATIC_ROOT нет, отдаём исходное имя.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            yield name, hashed_name, processed
+            if not dry_run and not isinstance(processed, Exception):
+                processed_names.update((name, hashed_name))
+        for name in sorted(processed_names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress_file(self.path(name))
+
+    @staticmethod
+    def compress_file(path):
+        """Сохраняет сжатые копии файла, если они меньше оригинала."""
+        with open(path, 'rb') as source:
+            data = source.read()
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data)
+        for extension, compressed in variants.items():
+            if len(compressed) >= len(data):
+                continue
+            with open(path + extension, 'wb') as target:
+                target.write(compressed)
+
+
+def accepts_encoding(accept_encoding, encoding):
+    """Принимает ли клиент кодировку по заголовку Accept-Encoding.
+
+    Кодировка с q=0 считается запрещённой, '*' относится ко всем
+    кодировкам, которых нет в заголовке.
+    """
+    qvalues = {}
+    for coding in accept_encoding.split(','):
+        name, *params = coding.split(';')
+        qvalue = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[name.strip().lower()] = qvalue
+    return qvalues.get(encoding, qvalues.get('*', 0.0)) > 0
+
+
+def compressed_variant(path, accept_encoding):
+    """Возвращает путь к заранее сжатой копии и её кодировку."""
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+    for encoding, extension in encodings:
+        if (accepts_encoding(accept_encoding, encoding)
+                and os.path.isfile(path + extension)):
+            return path + extension, encoding
+    return path, None
@@ -0,0 +1,86 @@
+"""Потоковый рендер страниц, унаследованных от base.html.
+
+Шаблон страницы рендерится без списка объектов, а на его месте
+выводится {{ stream }}. Всё, что до метки (head, шапка, заголовок),
+отдаётся клиенту сразу, затем по одному рендерятся объекты из
+итератора выборки, и в конце — остаток страницы. В памяти не
+собирается ни весь HTML, ни весь список объектов.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+STREAM_MARKER = '<!--stream-->'
+
+
+def iterate(items):
+    """Объекты выборки порциями из курсора, остальное как есть."""
+    if hasattr(items, 'iterator'):
+        return items.iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+    return iter(items)
+
+
+def with_last(iterable):
+    """Пары (объект, последний ли он)."""
+    iterator = iter(iterable)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def stream_page(request, template_name, context, items, item_template,
+                item_name, item_context=None):
+    """Генератор частей страницы template_name.
+
+    items рендерятся шаблоном item_template по одному; в его контексте
+    объект доступен как item_name, а forloop.last и forloop.first
+    работают как в обычном цикле.
+    """
+    context = dict(context, stream=mark_safe(STREAM_MARKER))
+    html = get_template(template_name).render(context, request)
+    head, tail = html.split(STREAM_MARKER, 1)
+    yield head
+    template = get_template(item_template).template
+    item_context = make_context(item_context or {}, request)
+    # контекстные процессоры выполняются один раз на все объекты
+    with item_context.bind_template(template):
+        for counter, (item, last) in enumerate(with_last(iterate(items))):
+            forloop = {'first': counter == 0, 'last': last,
+                       'counter': counter + 1}
+            with item_context.push({item_name: item, 'forloop': forloop}):
+                yield template.render(item_context)
+    yield tail
+
+
+def render_stream(request, template_name, context, items, item_template,
+                  item_name, item_context=None):
+    """Потоковый аналог render() для страниц со списком объектов."""
+    return StreamingHttpResponse(stream_page(
+        request, template_name, context, items, item_template, item_name,
+        item_context
+    ))
+
+
+def render_items(request, template_name, context, items_name, items,
+                 item_template, item_name, item_context=None):
+    """render() страницы со списком items, потоковый при STREAM_PAGES.
+
+    В шаблоне список перебирается из переменной items_name, после
+    цикла стоит {{ stream }}.
+    """
+    if settings.STREAM_PAGES:
+        context[items_name] = ()
+        return render_stream(
+            request, template_name, context, items, item_template,
+            item_name, item_context
+        )
+    context[items_name] = items
+    return render(request, template_name, context)
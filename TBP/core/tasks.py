@@ -0,0 +1,169 @@
+"""Небольшая фоновая очередь задач поверх базы данных.
+
+Задачи регистрируются декоратором ``task`` в модулях ``<app>/tasks.py``
+и ставятся в очередь через ``enqueue``. Выполняет их команда
+``python manage.py run_tasks``.
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func=None, *, name=None, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу."""
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        registry[func.task_name] = func
+        return func
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def enqueue(func, *args, dedupe_key=None, delay=0, **kwargs):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Если задача с тем же dedupe_key ещё ждёт выполнения, новая
+    не создаётся. Аргументы должны сериализоваться в JSON.
+    """
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return None
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=func.task_name,
+                payload=json.dumps([args, kwargs]),
+                dedupe_key=dedupe_key,
+                max_attempts=func.max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        return None
+
+
+def requeue_stale(now):
+    """Возвращает в очередь задачи, зависшие в статусе running дольше
+    TASKS_TIMEOUT (упавший воркер).
+
+    Задача без оставшихся попыток помечается ошибкой, иначе задача,
+    которая роняет воркер, повторялась бы бесконечно. Если такая же
+    задача (с тем же dedupe_key) уже ждёт в очереди, зависшая удаляется.
+    """
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASKS_TIMEOUT)
+    ).values_list('pk', 'name', 'attempts', 'max_attempts')
+    for pk, name, attempts, max_attempts in stale:
+        running = Task.objects.filter(pk=pk, status=Task.RUNNING)
+        if attempts >= max_attempts:
+            running.update(
+                status=Task.FAILED, finished=now,
+                last_error='Воркер не завершил задачу за TASKS_TIMEOUT'
+            )
+            logger.error('Задача %s (%s) зависла и не выполнена', name, pk)
+            continue
+        try:
+            with transaction.atomic():
+                running.update(status=Task.PENDING)
+        except IntegrityError:
+            running.delete()
+
+
+def claim_tasks(limit):
+    """Забирает до limit готовых к запуску задач, перед этим возвращает
+    в очередь зависшие (см. requeue_stale)."""
+    now = timezone.now()
+    requeue_stale(now)
+    candidates = list(Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).order_by('run_at').values_list('pk', flat=True)[:limit])
+    claimed = []
+    for pk in candidates:
+        updated = Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, started=now, attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def prune_tasks():
+    """Удаляет давно завершённые задачи, возвращает их число."""
+    now = timezone.now()
+    deleted = 0
+    for status, days in ((Task.DONE, settings.TASKS_KEEP_DONE_DAYS),
+                         (Task.FAILED, settings.TASKS_KEEP_FAILED_DAYS)):
+        deleted += Task.objects.filter(
+            status=status, finished__lt=now - timedelta(days=days)
+        ).delete()[0]
+    return deleted
+
+
+def run_task(pk):
+    """Выполняет задачу и возвращает её итоговый статус и длительность."""
+    started = time.monotonic()
+    task = Task.objects.get(pk=pk)
+    try:
+        func = registry[task.name]
+        args, kwargs = json.loads(task.payload)
+        func(*args, **kwargs)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+        else:
+            task.status = Task.FAILED
+            logger.exception('Задача %s (%s) не выполнена', task.name, pk)
+    else:
+        task.status = Task.DONE
+    task.finished = timezone.now()
+    task.save(update_fields=('status', 'run_at', 'finished', 'last_error'))
+    return task.status, task.attempts, time.monotonic() - started
+
+
+class WorkerMetrics:
+    """Счётчики воркера: выполнено, повторов, ошибок и время работы."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.retried = 0
+        self.failed = 0
+        self.busy_time = 0.0
+
+    def record(self, status, attempts, duration):
+        self.busy_time += duration
+        if status == Task.DONE:
+            self.done += 1
+        elif status == Task.FAILED:
+            self.failed += 1
+        else:
+            self.retried += 1
+
+    def __str__(self):
+        elapsed = time.monotonic() - self.started
+        processed = self.done + self.failed + self.retried
+        rate = processed / elapsed if elapsed else 0
+        return (
+            f'выполнено: {self.done}, повторов: {self.retried}, '
+            f'ошибок: {self.failed}, {rate:.1f} задач/с, '
+            f'занято: {self.busy_time:.1f} с'
+        )
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.page_cache import make_marker, render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, name, *args):
+    """Фрагмент страницы, зависящий от пользователя.
+
+    В общей копии страницы (core.page_cache.shared_page) вместо него
+    остаётся метка, которая заменяется при каждом ответе.
+    """
+    request = context['request']
+    if getattr(request, 'shared_page', False):
+        return mark_safe(make_marker(name, args))
+    return mark_safe(render_fragment(request, name, args))
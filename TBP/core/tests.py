@@ -0,0 +1,487 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.test import (
+    TestCase, Client, RequestFactory, override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import single_flight
+from .group_commit import GroupCommit, GroupCommitError
+from .metrics import collect, render_prometheus
+from .middleware.compression import CompressionMiddleware
+from .models import Task, SlowQuery
+from .page_cache import page_key, shared_page
+from .paginator import WindowedPaginator
+from .profiler import make_token
+from .slow_queries import normalize_sql
+from .storage import accepts_encoding
+from .tasks import task, enqueue, claim_tasks, prune_tasks, run_task
+from .views import media_serve, static_serve
+from .warmup import warm_up
+
+calls = []
+
+
+@task(max_attempts=2)
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def always_fail():
+    raise RuntimeError('Ошибка задачи')
+
+
+def use_temp_dir(cls, setting):
+    """Подменяет настройку setting временным каталогом на время
+    тестов класса и удаляет каталог после них."""
+    path = tempfile.mkdtemp()
+    cls.addClassCleanup(shutil.rmtree, path, ignore_errors=True)
+    override = override_settings(**{setting: path})
+    override.enable()
+    cls.addClassCleanup(override.disable)
+    return path
+
+
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+
+    @override_settings(COMPRESS_MIN_SIZE=0)
+    def test_html_compressed_when_accepted(self):
+        """HTML-ответ сжимается, если клиент принимает gzip."""
+        plain = self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(COMPRESS_MIN_SIZE=10 ** 9)
+    def test_small_response_not_compressed(self):
+        """Ответы меньше порога не сжимаются."""
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESS_MIN_SIZE=0)
+    def test_ranged_response_not_compressed(self):
+        """Ответы с диапазонами отдаются как есть."""
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        for headers in ({'Accept-Ranges': 'bytes'},
+                        {'Content-Range': 'bytes 0-9/3000'}):
+            response = HttpResponse('x' * 3000, content_type='text/plain')
+            for name, value in headers.items():
+                response[name] = value
+            response = CompressionMiddleware().process_response(
+                request, response
+            )
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESS_MIN_SIZE=0)
+    def test_refused_encoding_not_used(self):
+        """Кодировка с q=0 не используется."""
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(accepts_encoding('br;q=0.5, gzip', 'br'))
+        self.assertTrue(accepts_encoding('*', 'gzip'))
+        self.assertFalse(accepts_encoding('*, gzip;q=0', 'gzip'))
+        self.assertFalse(accepts_encoding('gzip;q=0.0', 'gzip'))
+        self.assertFalse(accepts_encoding('', 'gzip'))
+
+    def test_static_traversal_not_found(self):
+        """Путь за пределы STATIC_ROOT даёт 404."""
+        with self.assertRaises(Http404):
+            static_serve(RequestFactory().get('/'), '../secret')
+
+
+@override_settings(TASKS_EAGER=0, TASKS_RETRY_DELAY=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача из очереди выполняется воркером."""
+        enqueue(record_call, 'значение')
+        claimed = claim_tasks(limit=10)
+        self.assertEqual(len(claimed), 1)
+        status, attempts, _ = run_task(claimed[0])
+        self.assertEqual((status, attempts), (Task.DONE, 1))
+        self.assertEqual(calls, ['значение'])
+        self.assertEqual(claim_tasks(limit=10), [])
+
+    def test_dedupe_key(self):
+        """Задача с тем же ключом не ставится в очередь повторно."""
+        enqueue(record_call, 1, dedupe_key='key')
+        enqueue(record_call, 2, dedupe_key='key')
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется и после max_attempts помечается
+        ошибкой."""
+        enqueue(always_fail)
+        status, _, _ = run_task(claim_tasks(limit=1)[0])
+        self.assertEqual(status, Task.PENDING)
+        with self.assertLogs('core.tasks', level='ERROR') as logs:
+            status, attempts, _ = run_task(claim_tasks(limit=1)[0])
+        self.assertEqual((status, attempts), (Task.FAILED, 2))
+        self.assertIn('не выполнена', logs.output[0])
+        self.assertIn('Ошибка задачи', Task.objects.get().last_error)
+
+    @override_settings(TASKS_TIMEOUT=60)
+    def test_stale_tasks_requeued(self):
+        """Зависшая задача возвращается в очередь, без попыток —
+        помечается ошибкой, при такой же задаче в очереди — удаляется."""
+        started = timezone.now() - timedelta(minutes=5)
+        retried, exhausted, duplicate = (
+            Task.objects.create(
+                name=record_call.task_name, status=Task.RUNNING,
+                started=started, attempts=attempts, dedupe_key=key
+            )
+            for attempts, key in ((1, None), (3, None), (1, 'key'))
+        )
+        enqueue(record_call, 1, dedupe_key='key')
+        with self.assertLogs('core.tasks', level='ERROR'):
+            claimed = claim_tasks(limit=10)
+        self.assertEqual(len(claimed), 2)
+        self.assertIn(retried.pk, claimed)
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertFalse(Task.objects.filter(pk=duplicate.pk).exists())
+
+    @override_settings(TASKS_KEEP_DONE_DAYS=7, TASKS_KEEP_FAILED_DAYS=30)
+    def test_prune_finished_tasks(self):
+        """Давно завершённые задачи удаляются, остальные остаются."""
+        now = timezone.now()
+        for status, days in ((Task.DONE, 8), (Task.DONE, 1),
+                             (Task.FAILED, 8), (Task.FAILED, 31),
+                             (Task.PENDING, 100)):
+            Task.objects.create(
+                name='t', status=status, finished=now - timedelta(days=days)
+            )
+        self.assertEqual(prune_tasks(), 2)
+        self.assertEqual(
+            sorted(Task.objects.values_list('status', flat=True)),
+            [Task.DONE, Task.FAILED, Task.PENDING]
+        )
+
+
+@override_settings(PAGINATOR_ON_EACH_SIDE=2)
+class WindowedPaginatorTests(TestCase):
+    def test_window_is_bounded(self):
+        """В навигации только страницы вокруг текущей, первая и
+        последняя."""
+        page = WindowedPaginator(list(range(3000)), 3).get_page(500)
+        self.assertEqual(
+            page.window, [1, None, 498, 499, 500, 501, 502, None, 1000]
+        )
+
+    def test_stale_count_does_not_cut_page(self):
+        """Устаревшее число объектов не влияет на содержимое страницы."""
+        paginator = WindowedPaginator(list(range(10)), 3)
+        paginator.count = 2
+        page = paginator.get_page(2)
+        self.assertEqual(list(page), [3, 4, 5])
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.last_page_number, 3)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        use_temp_dir(cls, 'METRICS_DIR')
+        super().setUpClass()
+
+    def test_metrics_by_view_name(self):
+        """На /metrics есть гистограмма времени ответа по имени URL."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        response = client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        content = response.content.decode()
+        self.assertIn(
+            'tbp_request_duration_seconds_count{view="posts:index",'
+            'method="GET",status="200"}', content
+        )
+        self.assertIn('tbp_db_queries_bucket{view="posts:index"', content)
+
+    def test_metrics_hidden_from_other_addresses(self):
+        """Метрики недоступны с внешних адресов."""
+        response = Client().get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SINGLE_FLIGHT_POLL=0.01)
+class SingleFlightTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        use_temp_dir(cls, 'METRICS_DIR')
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_computed_once(self):
+        """При одновременных промахах значение вычисляется один раз."""
+        computed = []
+
+        def compute():
+            computed.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                single_flight('sf:key', compute, 60, name='test')
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(computed, [1])
+        self.assertEqual(results, ['value'] * 5)
+        content = render_prometheus(*collect())
+        self.assertIn(
+            'tbp_single_flight_total{name="test",outcome="waited"} 4', content
+        )
+
+    def test_stale_copy_served_during_recompute(self):
+        """Пока другой воркер пересчитывает, отдаётся старая копия."""
+        single_flight('sf:v1', lambda: 'old', 60, stale_key='sf:stale')
+        cache.add('lock:sf:v2', 1)
+        value = single_flight(
+            'sf:v2', lambda: 'new', 60, stale_key='sf:stale'
+        )
+        self.assertEqual(value, 'old')
+
+    def test_streamed_page_keeps_lock(self):
+        """Потоковая страница держит блокировку, пока не отдана
+        целиком, а пользователь и CSRF-токен загружаются заранее."""
+        @shared_page('stream')
+        def view(request):
+            return StreamingHttpResponse(iter(['a', 'b']))
+
+        request = RequestFactory().get('/stream/')
+        request.user = AnonymousUser()
+        response = view(request)
+        lock_key = f'lock:{page_key(request, ("stream",))}'
+        self.assertTrue(request.META['CSRF_COOKIE_USED'])
+        self.assertIsNotNone(cache.get(lock_key))
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+        self.assertIsNone(cache.get(lock_key))
+        response = view(request)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+
+class GroupCommitTests(TestCase):
+    def test_concurrent_items_written_together(self):
+        """Одновременные записи попадают в одну пачку, ошибка объекта
+        достаётся только его потоку."""
+        batches = []
+
+        def write(items):
+            batches.append(list(items))
+            return [ValueError() if item < 0 else None for item in items]
+
+        writer = GroupCommit(write)
+        errors = []
+
+        def submit(item):
+            try:
+                writer.submit(item, max_size=10, max_delay=0.5)
+            except ValueError:
+                errors.append(item)
+
+        threads = [
+            threading.Thread(target=submit, args=(item,))
+            for item in (-1, 1, 2, 3, 4)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(sorted(batches[0]), [-1, 1, 2, 3, 4])
+        self.assertEqual(errors, [-1])
+        writer.submit(5, max_size=1, max_delay=10)
+        self.assertEqual(batches[-1], [5])
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_failed_batch_error_per_thread(self):
+        """Если пачка не записана, каждый поток получает своё
+        исключение, связанное с исходной ошибкой."""
+        original = RuntimeError('database is locked')
+
+        def write(items):
+            raise original
+
+        writer = GroupCommit(write)
+        errors = []
+
+        def submit(item):
+            try:
+                writer.submit(item, max_size=3, max_delay=1)
+            except GroupCommitError as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=submit, args=(item,))
+            for item in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(error) for error in errors}), 3)
+        for error in errors:
+            self.assertIs(error.__cause__, original)
+
+
+class SlowQueryTests(TestCase):
+    def test_normalize_sql(self):
+        """Запросы, отличающиеся только литералами, совпадают."""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 1 AND b IN (%s, %s)"),
+            normalize_sql("SELECT  * FROM t WHERE a = 25 AND b IN (%s)"),
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0, PAGE_CACHE_TIMEOUT=0)
+    def test_slow_queries_recorded_with_plan(self):
+        """Медленные запросы сохраняются с представлением и планом."""
+        client = Client()
+        with self.assertLogs('core.slow_queries', level='WARNING'):
+            client.get(reverse('posts:index'))
+            client.get(reverse('posts:index'))
+        query = SlowQuery.objects.get(sql__contains='"posts_post"')
+        self.assertEqual(query.view, 'posts:index')
+        self.assertEqual(query.count, 2)
+        self.assertIn('posts_post', query.plan)
+
+
+@override_settings(PROFILE_INTERVAL=0.001)
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        use_temp_dir(cls, 'PROFILE_DIR')
+        super().setUpClass()
+
+    def setUp(self):
+        call_command('profile_report', clear=True)
+
+    def test_profile_by_signed_header(self):
+        """Запрос с подписанным заголовком профилируется."""
+        response = Client().get(
+            reverse('posts:index'), HTTP_X_PROFILE=make_token()
+        )
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(profile_id.endswith('.collapsed'))
+        self.assertIn(
+            profile_id,
+            os.listdir(os.path.join(settings.PROFILE_DIR, 'posts-index'))
+        )
+        out = StringIO()
+        call_command('profile_report', stdout=out)
+        self.assertIn('posts:index: 1 профилей', out.getvalue())
+
+    def test_profile_not_triggered_by_others(self):
+        """Без подписи и не сотрудникам профиль не снимается."""
+        client = Client()
+        response = client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        user = get_user_model().objects.create_user(username='reader')
+        client.force_login(user)
+        response = client.get(reverse('posts:index') + '?profile')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        user.is_staff = True
+        user.save()
+        response = client.get(reverse('posts:index') + '?profile')
+        self.assertTrue(response.has_header('X-Profile-Id'))
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_steps(self):
+        """Прогрев компилирует шаблоны и строит URL-резолвер."""
+        report = {
+            name: count for name, count, _ in warm_up(freeze=False)
+        }
+        self.assertGreater(report['шаблоны'], 0)
+        self.assertGreater(report['URL-резолвер'], 0)
+
+
+@override_settings(MEDIA_SERVE='django')
+class MediaServeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        root = use_temp_dir(cls, 'MEDIA_ROOT')
+        super().setUpClass()
+        os.makedirs(os.path.join(root, 'cache'))
+        for name in ('posts.txt', 'cache/thumb.txt'):
+            with open(os.path.join(root, name), 'wb') as file:
+                file.write(b'0123456789')
+        cls.factory = RequestFactory()
+
+    def get(self, path, **headers):
+        return media_serve(self.factory.get('/media/' + path, **headers), path)
+
+    def test_full_file_with_validators(self):
+        """Файл отдаётся целиком с ETag и поддержкой Range."""
+        response = self.get('posts.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.get('posts.txt', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        """Диапазоны отдаются с кодом 206, недопустимые — с кодом 416."""
+        response = self.get('posts.txt', HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        response = self.get('posts.txt', HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.get('posts.txt', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        response = self.get(
+            'posts.txt', HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_thumbnails_immutable(self):
+        """Миниатюры кэшируются как неизменяемые."""
+        response = self.get('cache/thumb.txt')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_SERVE='x-accel')
+    def test_x_accel_redirect(self):
+        """В режиме x-accel файл отдаёт nginx."""
+        response = self.get('posts.txt')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts.txt'
+        )
+        self.assertEqual(response.content, b'')
+        with self.assertRaises(Http404):
+            self.get('../secret')
@@ -1,4 +1,23 @@
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .metrics import collect, render_prometheus
+from .storage import compressed_variant
+
+re_hashed_name = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+re_range = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 def csrf_failure(request, reason=''):
@@ -15,3 +34,177 @@ def page_not_found(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def static_serve(request, path):
+    """Отдаёт собранную статику с заранее сжатыми вариантами.
+
+    Файлы с хэшем в имени кэшируются браузером на STATIC_MAX_AGE.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(full_path)
+    file_path, encoding = compressed_variant(
+        full_path, request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    response = FileResponse(
+        open(file_path, 'rb'),
+        content_type=content_type or 'application/octet-stream'
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if re_hashed_name.search(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+class RangeFile:
+    """Часть файла для FileResponse.
+
+    fileno() и позиция в файле позволяют WSGI-серверу отдать часть
+    через sendfile (gunicorn учитывает Content-Length), а read() не
+    выходит за границу части при обычной отдаче.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(начало, длина) для заголовка Range из одного диапазона.
+
+    None — заголовка нет или он не поддерживается (отдаётся весь
+    файл), ValueError — диапазон за пределами файла.
+    """
+    match = re_range.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError
+    return start, end - start + 1
+
+
+def media_serve(request, path):
+    """Отдаёт загруженные файлы из MEDIA_ROOT.
+
+    В зависимости от MEDIA_SERVE файл передаётся веб-серверу
+    заголовком X-Accel-Redirect (nginx) или X-Sendfile (Apache,
+    lighttpd) либо отдаётся через FileResponse с поддержкой Range,
+    If-Range, If-None-Match и If-Modified-Since. Миниатюры sorl
+    (их имя — хэш исходника и параметров) кэшируются как неизменяемые.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not S_ISREG(stat.st_mode):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_SERVE == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(path)
+        )
+    elif settings.MEDIA_SERVE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = file_response(request, full_path, stat, content_type)
+
+    if path.startswith(thumbnail_settings.THUMBNAIL_PREFIX):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+        )
+    return response
+
+
+def file_response(request, full_path, stat, content_type):
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            RangeFile(file, start, length), content_type=content_type,
+            status=206
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        render_prometheus(*collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
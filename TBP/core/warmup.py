@@ -0,0 +1,121 @@
+"""Прогрев процесса до форка воркеров.
+
+Всё, что Django и библиотеки делают лениво на первых запросах
+(разбор URL, компиляция шаблонов, загрузка библиотек тегов, настройка
+sorl-thumbnail и плагинов PIL), выполняется при импорте tbp.wsgi.
+При запуске gunicorn с --preload воркеры получают готовый результат
+от мастер-процесса через copy-on-write.
+"""
+import gc
+import importlib
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.template import engines
+from django.template.loaders.app_directories import get_app_template_dirs
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    """Строит резолвер и словари reverse() для всех пространств имён."""
+    resolver = get_resolver()
+    resolver.url_patterns
+    for _, sub_resolver in resolver.namespace_dict.values():
+        sub_resolver.reverse_dict
+    resolver.reverse_dict
+    reverse('posts:index')
+    return len(resolver.reverse_dict)
+
+
+def template_names(directories):
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(('.html', '.txt', '.xml')):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    )
+
+
+def warm_templates():
+    """Компилирует все шаблоны проекта и приложений.
+
+    Скомпилированные шаблоны сохраняются кэширующим загрузчиком,
+    который Django включает при DEBUG = False.
+    """
+    count = 0
+    for engine in engines.all():
+        directories = list(engine.dirs) + list(
+            get_app_template_dirs('templates')
+        )
+        for name in sorted(set(template_names(directories))):
+            try:
+                engine.get_template(name)
+            except Exception:
+                logger.warning('Шаблон %s не компилируется', name,
+                               exc_info=True)
+                continue
+            count += 1
+    return count
+
+
+def warm_thumbnails():
+    """Создаёт движок, хранилище и backend sorl-thumbnail и
+    регистрирует плагины форматов PIL."""
+    from PIL import Image
+    from sorl.thumbnail import default
+
+    default.backend, default.engine, default.kvstore, default.storage
+    importlib.import_module('sorl.thumbnail.templatetags.thumbnail')
+    Image.init()
+    return len(Image.OPEN)
+
+
+def warm_modules():
+    """Импортирует модули приложений, которые иначе грузятся
+    при первом обращении."""
+    count = 0
+    for app_config in apps.get_app_configs():
+        for name in ('views', 'forms', 'admin', 'fragments', 'tasks'):
+            module = f'{app_config.name}.{name}'
+            try:
+                importlib.import_module(module)
+            except ImportError as error:
+                if error.name != module:
+                    raise
+                continue
+            count += 1
+    return count
+
+
+STEPS = (
+    ('модули приложений', warm_modules),
+    ('URL-резолвер', warm_urls),
+    ('шаблоны', warm_templates),
+    ('sorl-thumbnail и PIL', warm_thumbnails),
+)
+
+
+def warm_up(freeze=True):
+    """Выполняет все шаги прогрева, возвращает [(шаг, объектов, с)].
+
+    После прогрева объекты переводятся в постоянное поколение сборщика
+    мусора, чтобы его проходы в воркерах не копировали страницы памяти,
+    общие с мастер-процессом.
+    """
+    report = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        count = step()
+        duration = time.perf_counter() - started
+        report.append((name, count, duration))
+        logger.info('Прогрев: %s — %s за %.3f с', name, count, duration)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return report
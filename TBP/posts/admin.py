@@ -1,16 +1,70 @@
+from django.conf import settings
 from django.contrib import admin
 
+from core.paginator import EstimatedCountPaginator
 from .models import Post, Group
+from .stats import rebuild_group_stats
+
+
+def process_in_batches(queryset, handler, batch_size=None):
+    """Передаёт выборку в handler пачками первичных ключей.
+
+    Ключи выбираются по возрастанию pk, поэтому каждая пачка
+    читается по индексу, а транзакции остаются короткими.
+    """
+    batch_size = batch_size or settings.ADMIN_BATCH_SIZE
+    model = queryset.model
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk, total = None, 0
+    while True:
+        page = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return total
+        total += handler(model.objects.filter(pk__in=batch))
+        last_pk = batch[-1]
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'created', 'author', 'group', 'created')
+    list_display = ('pk', 'text', 'created', 'author', 'group')
+    list_select_related = ('author', 'group')
     list_editable = ('group', )
     search_fields = ('text',)
-    list_filter = ('created',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('remove_from_group', 'delete_in_batches')
 
     empty_value_display = '-пусто-'
 
+    def remove_from_group(self, request, queryset):
+        group_ids = set()
+
+        def handler(batch):
+            group_ids.update(batch.values_list('group_id', flat=True))
+            return batch.update(group=None)
+
+        updated = process_in_batches(queryset, handler)
+        # update() не отправляет сигналы, пересчитываем затронутые группы
+        group_ids.discard(None)
+        rebuild_group_stats(group_ids)
+        self.message_user(request, f'Убрано из групп постов: {updated}')
+    remove_from_group.short_description = 'Убрать из группы'
+
+    def delete_in_batches(self, request, queryset):
+        deleted = process_in_batches(
+            queryset, lambda batch: batch.delete()[1].get('posts.Post', 0)
+        )
+        self.message_user(request, f'Удалено постов: {deleted}')
+    delete_in_batches.short_description = 'Удалить выбранные посты пачками'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,114 @@
+"""Перенос старых постов и комментариев в архивные таблицы.
+
+Горячие таблицы posts_post и posts_comment остаются небольшими, а
+просмотр поста и профиля автора читают архив прозрачно.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction, OperationalError
+from django.http import Http404
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Post, Comment, ArchivedPost, ArchivedComment
+
+POST_FIELDS = (
+    'id', 'created', 'text', 'excerpt', 'author_id', 'group_id', 'image'
+)
+COMMENT_FIELDS = ('id', 'created', 'post_id', 'author_id', 'text')
+
+
+def archive_batch(post_ids):
+    """Переносит посты с их комментариями в архив одной транзакцией."""
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=post_ids).values(*POST_FIELDS)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**post) for post in posts
+        )
+        comments = Comment.objects.filter(
+            post_id__in=post_ids
+        ).values(*COMMENT_FIELDS)
+        ArchivedComment.objects.bulk_create(
+            (ArchivedComment(**comment) for comment in comments),
+            batch_size=500
+        )
+        Comment.objects.filter(post_id__in=post_ids).delete()
+        Post.objects.filter(pk__in=post_ids).delete()
+
+
+def archive_old_posts(days, batch_size=500):
+    """Архивирует посты старше days дней, возвращает их количество."""
+    cutoff = timezone.now() - timedelta(days=days)
+    old_posts = Post.objects.filter(created__lt=cutoff).order_by('pk')
+    total = 0
+    while True:
+        post_ids = list(old_posts.values_list('pk', flat=True)[:batch_size])
+        if not post_ids:
+            return total
+        archive_batch(post_ids)
+        total += len(post_ids)
+
+
+def get_post_or_archived(post_id):
+    """Пост из горячей таблицы или из архива, иначе 404."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        post = ArchivedPost.objects.select_related('author', 'group').filter(
+            pk=post_id
+        ).first()
+    if post is None:
+        raise Http404
+    return post
+
+
+class PostsWithArchive:
+    """Посты из горячей таблицы, а за ними архивные, для пагинатора.
+
+    В архив попадают только посты старше всех оставшихся, поэтому
+    при сортировке по убыванию даты архивная часть идёт следом.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    def count(self):
+        return self.hot_count + self.archived.count()
+
+    def __getitem__(self, key):
+        start, stop = key.start or 0, key.stop
+        result = []
+        if start < self.hot_count:
+            result.extend(self.hot[start:min(stop, self.hot_count)])
+        if stop > self.hot_count:
+            result.extend(self.archived[
+                max(start - self.hot_count, 0):stop - self.hot_count
+            ])
+        return result
+
+
+def table_stats():
+    """Число строк и размер (в байтах) горячих и архивных таблиц."""
+    stats = {}
+    for model in (Post, Comment, ArchivedPost, ArchivedComment):
+        table = model._meta.db_table
+        size = None
+        if connection.vendor == 'sqlite':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT SUM(pgsize) FROM dbstat WHERE name = %s',
+                        [table]
+                    )
+                    size = cursor.fetchone()[0]
+            except OperationalError:
+                # SQLite собран без dbstat
+                pass
+        stats[table] = (model.objects.count(), size)
+    return stats
@@ -0,0 +1,269 @@
+"""Автодополнение имён авторов и групп по префиксу.
+
+Индекс хранится в памяти процесса: отсортированный список пар
+(ключ, объект), где ключи — имя пользователя, полное имя, название
+и slug группы и отдельные слова в них, в нижнем регистре. Поиск —
+bisect по префиксу. Для самых коротких префиксов, под которые
+подходит много объектов, лучшие результаты считаются заранее.
+
+Изменения в этом процессе вносятся в индекс сигналами сразу. Другие
+процессы узнают о них по версии 'autocomplete' в кэше (если кэш общий)
+и в любом случае перестраивают индекс раз в AUTOCOMPLETE_MAX_AGE.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.urls import NoReverseMatch, reverse
+
+from core.cache import bump_cache_version, get_cache_version
+from .models import Group, User
+
+# префиксы не длиннее этого получают заранее посчитанный топ
+SHORT_PREFIX = 2
+
+
+def index_keys(*texts):
+    """Ключи объекта: каждый текст целиком и его отдельные слова."""
+    keys = set()
+    for text in texts:
+        text = (text or '').casefold().strip()
+        if text:
+            keys.add(text)
+            keys.update(text.split())
+    return keys
+
+
+def item_url(name, **kwargs):
+    """Адрес объекта или None, если имя в адрес не подходит."""
+    try:
+        return reverse(name, kwargs=kwargs)
+    except NoReverseMatch:
+        return None
+
+
+def short_prefixes(keys):
+    return {
+        key[:length] for key in keys
+        for length in range(1, min(SHORT_PREFIX, len(key)) + 1)
+    }
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = []
+        self.items = {}
+        self.keys = {}
+        self.top = {}
+        self.version = None
+        self.built = 0
+        self.checked = 0
+
+    def build(self):
+        """Строит индекс заново по базе данных."""
+        version = get_cache_version('autocomplete')
+        items = {}
+        users = User.objects.annotate(
+            followers=Count('following')
+        ).values_list('pk', 'username', 'first_name', 'last_name',
+                      'followers')
+        for pk, username, first_name, last_name, followers in users:
+            items[('user', pk)] = self.user_item(
+                username, first_name, last_name, followers
+            )
+        groups = Group.objects.values_list(
+            'pk', 'title', 'slug', 'stats__post_count'
+        )
+        for pk, title, slug, post_count in groups:
+            items[('group', pk)] = self.group_item(
+                title, slug, post_count or 0
+            )
+        with self.lock:
+            self.items = {}
+            self.keys = {}
+            entries = []
+            for ref, (item, keys) in items.items():
+                if item is None:
+                    continue
+                self.items[ref] = item
+                self.keys[ref] = keys
+                entries.extend((key, ref) for key in keys)
+            entries.sort()
+            self.entries = entries
+            self.top = {}
+            prefixes = set()
+            for keys in self.keys.values():
+                prefixes |= short_prefixes(keys)
+            for prefix in prefixes:
+                self.top[prefix] = self.rank(self.scan(prefix))
+            self.version = version
+            self.built = self.checked = time.monotonic()
+
+    @staticmethod
+    def user_item(username, first_name, last_name, followers):
+        full_name = f'{first_name} {last_name}'.strip()
+        item = {
+            'kind': 'user',
+            'label': f'{full_name} ({username})' if full_name else username,
+            'url': item_url('posts:profile', username=username),
+            'score': followers,
+        }
+        if item['url'] is None:
+            return None, set()
+        return item, index_keys(username, full_name)
+
+    @staticmethod
+    def group_item(title, slug, post_count):
+        item = {
+            'kind': 'group',
+            'label': title,
+            'url': item_url('posts:group_list', slug=slug),
+            'score': post_count,
+        }
+        if item['url'] is None:
+            return None, set()
+        return item, index_keys(title, slug)
+
+    def scan(self, prefix):
+        """Объекты, у которых есть ключ с таким префиксом."""
+        refs = set()
+        entries = self.entries
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries):
+            key, ref = entries[position]
+            if not key.startswith(prefix):
+                break
+            refs.add(ref)
+            position += 1
+        return refs
+
+    def rank(self, refs):
+        items = self.items
+        return sorted(
+            refs, key=lambda ref: (-items[ref]['score'], items[ref]['label'])
+        )[:settings.AUTOCOMPLETE_LIMIT]
+
+    def lookup(self, prefix):
+        """До AUTOCOMPLETE_LIMIT объектов, лучшие первыми."""
+        prefix = prefix.casefold().strip()
+        if not prefix:
+            return []
+        self.refresh()
+        with self.lock:
+            if len(prefix) <= SHORT_PREFIX:
+                refs = self.top.get(prefix, [])
+            else:
+                refs = self.rank(self.scan(prefix))
+            return [self.items[ref] for ref in refs]
+
+    def refresh(self):
+        """Перестраивает индекс, если он устарел или не построен."""
+        now = time.monotonic()
+        if self.version is not None:
+            if now - self.checked < settings.AUTOCOMPLETE_CHECK_INTERVAL:
+                return
+            self.checked = now
+            if (now - self.built < settings.AUTOCOMPLETE_MAX_AGE
+                    and get_cache_version('autocomplete') == self.version):
+                return
+        self.build()
+
+    def put(self, ref, item, keys):
+        """Добавляет или заменяет объект ref."""
+        if item is None:
+            self.remove(ref)
+            return
+        with self.lock:
+            old_keys = self.keys.get(ref, set())
+            for key in old_keys - keys:
+                position = bisect_left(self.entries, (key, ref))
+                del self.entries[position]
+            for key in keys - old_keys:
+                insort(self.entries, (key, ref))
+            self.items[ref] = item
+            self.keys[ref] = keys
+            self.update_top(old_keys | keys)
+
+    def remove(self, ref):
+        with self.lock:
+            keys = self.keys.pop(ref, None)
+            if keys is None:
+                return
+            for key in keys:
+                position = bisect_left(self.entries, (key, ref))
+                del self.entries[position]
+            del self.items[ref]
+            self.update_top(keys)
+
+    def adjust_score(self, ref, delta):
+        with self.lock:
+            item = self.items.get(ref)
+            if item is None:
+                return
+            item['score'] += delta
+            self.update_top(self.keys[ref])
+
+    def update_top(self, keys):
+        for prefix in short_prefixes(keys):
+            top = self.rank(self.scan(prefix))
+            if top:
+                self.top[prefix] = top
+            else:
+                self.top.pop(prefix, None)
+
+    def changed(self, update, notify=True):
+        """Применяет изменение update к построенному индексу.
+
+        При notify о нём узнают другие процессы: они перестроят индекс.
+        Версия меняется после фиксации транзакции, иначе другой процесс
+        мог бы перестроить индекс по старым данным с новой версией.
+        Счётчики подписчиков и постов меняются часто, их другие процессы
+        подхватывают при плановой перестройке.
+        """
+        if self.version is not None:
+            with self.lock:
+                update()
+        if notify:
+            transaction.on_commit(self.notify)
+
+    def notify(self):
+        bump_cache_version('autocomplete')
+        if self.version is not None:
+            with self.lock:
+                self.version = get_cache_version('autocomplete')
+
+
+index = PrefixIndex()
+
+
+def score(ref):
+    item = index.items.get(ref)
+    return item['score'] if item else 0
+
+
+def user_changed(user):
+    ref = ('user', user.pk)
+    index.changed(lambda: index.put(ref, *index.user_item(
+        user.username, user.first_name, user.last_name, score(ref)
+    )))
+
+
+def group_changed(group):
+    ref = ('group', group.pk)
+    index.changed(lambda: index.put(ref, *index.group_item(
+        group.title, group.slug, score(ref)
+    )))
+
+
+def removed(kind, pk):
+    index.changed(lambda: index.remove((kind, pk)))
+
+
+def score_changed(kind, pk, delta):
+    index.changed(
+        lambda: index.adjust_score((kind, pk), delta), notify=False
+    )
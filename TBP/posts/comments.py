@@ -0,0 +1,50 @@
+"""Запись комментариев с групповой фиксацией (COMMENT_GROUP_COMMIT).
+
+На SQLite каждая транзакция — это захват блокировки записи и fsync.
+Во время всплесков комментарии, пришедшие в процесс почти
+одновременно, пишутся одной транзакцией (core.group_commit). Ответ
+отдаётся только после фиксации, так что автор сразу видит свой
+комментарий, а подтверждённый комментарий не теряется.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from core.cache import bump_cache_version
+from core.group_commit import GroupCommit
+from .models import Comment
+
+
+def save_one(comment):
+    try:
+        with transaction.atomic():
+            comment.save()
+    except IntegrityError as error:
+        return error
+    return None
+
+
+def write_comments(comments):
+    """Записывает пачку одной транзакцией, возвращает ошибки по
+    комментариям или None."""
+    try:
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+    except IntegrityError:
+        # пост удалили, пока собиралась пачка
+        return [save_one(comment) for comment in comments]
+    # bulk_create не посылает post_save
+    bump_cache_version(*{f'post:{comment.post_id}' for comment in comments})
+    return None
+
+
+writer = GroupCommit(write_comments)
+
+
+def save_comment(comment):
+    """Сохраняет комментарий, при COMMENT_GROUP_COMMIT — в пачке."""
+    if not settings.COMMENT_GROUP_COMMIT:
+        comment.save()
+        return
+    writer.submit(
+        comment, settings.COMMENT_BATCH_SIZE, settings.COMMENT_BATCH_DELAY
+    )
@@ -0,0 +1,224 @@
+"""Ленты RSS и Atom: весь сайт, группа, автор.
+
+Лента хранится в кэше вместе с XML каждой записи, ETag и датой
+последнего поста. Новый пост дописывается в начало уже построенных
+лент: рендерится одна запись, остальные берутся готовыми. Правка и
+удаление поста сбрасывают ленты, и они строятся заново при следующем
+запросе. Опрос без изменений стоит нескольких обращений к кэшу
+и ответа 304.
+"""
+import hashlib
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from core.cache import bump_cache_version, get_cache_version, single_flight
+from .models import Group, GroupAuthorStats, Post, User
+
+TITLE_LENGTH = 80
+
+
+class CachedEntries:
+    """Генератор ленты, который выводит ещё и готовые записи."""
+
+    def __init__(self, *args, entries=(), updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entries = entries
+        self.updated = updated
+
+    def write_items(self, handler):
+        for xml in self.entries:
+            handler.ignorableWhitespace(xml)
+        super().write_items(handler)
+
+    def latest_post_date(self):
+        return self.updated or super().latest_post_date()
+
+
+class RssFeed(CachedEntries, Rss201rev2Feed):
+    pass
+
+
+class AtomFeed(CachedEntries, Atom1Feed):
+    pass
+
+
+FORMATS = {'rss': RssFeed, 'atom': AtomFeed}
+
+
+def feed_key(scope, fmt):
+    versions = '.'.join(
+        str(get_cache_version(name))
+        for name in ('pages', f'syndication:{scope}')
+    )
+    return f'syndication:{scope}:{fmt}:{versions}'
+
+
+def feed_meta(scope, base):
+    """Заголовок, ссылка и описание ленты scope."""
+    kind, _, pk = scope.partition(':')
+    if kind == 'group':
+        group = Group.objects.get(pk=pk)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        return {'title': group.title, 'link': base + url,
+                'description': group.description}
+    if kind == 'author':
+        author = User.objects.get(pk=pk)
+        name = author.get_full_name() or author.username
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        return {'title': name, 'link': base + url,
+                'description': f'Посты автора {name}'}
+    title = 'Последние обновления на сайте'
+    return {'title': title, 'link': base + reverse('posts:index'),
+            'description': title}
+
+
+def feed_posts(scope):
+    kind, _, pk = scope.partition(':')
+    posts = Post.objects.select_related('author', 'group')
+    if kind == 'group':
+        posts = posts.filter(group_id=pk)
+    elif kind == 'author':
+        posts = posts.filter(author_id=pk)
+    return posts[:settings.FEED_ITEMS]
+
+
+def post_item(post, base):
+    link = base + reverse('posts:post_detail', kwargs={'post_id': post.pk})
+    return {
+        'title': Truncator(post.text).chars(TITLE_LENGTH),
+        'link': link,
+        'unique_id': link,
+        'description': post.text,
+        'author_name': post.author.get_full_name() or post.author.username,
+        'pubdate': post.created,
+        'categories': (post.group.title,) if post.group_id else (),
+    }
+
+
+def render_entry(fmt, meta, post, base):
+    """XML одной записи ленты."""
+    generator = FORMATS[fmt](**meta)
+    generator.add_item(**post_item(post, base))
+    output = StringIO()
+    generator.write_items(SimplerXMLGenerator(output, 'utf-8'))
+    return output.getvalue()
+
+
+def assemble(fmt, state):
+    """Собирает документ ленты из готовых записей."""
+    entries = state['entries']
+    updated = entries[0][1] if entries else None
+    body = FORMATS[fmt](
+        **state['meta'], entries=[xml for _, _, xml in entries],
+        updated=updated
+    ).writeString('utf-8')
+    state['body'] = body
+    state['etag'] = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+    state['last_modified'] = int(updated.timestamp()) if updated else None
+    return state
+
+
+def build_feed(scope, fmt, base, feed_url):
+    meta = dict(feed_meta(scope, base), feed_url=feed_url)
+    entries = [
+        (post.pk, post.created, render_entry(fmt, meta, post, base))
+        for post in feed_posts(scope)
+    ]
+    return assemble(fmt, {'base': base, 'meta': meta, 'entries': entries})
+
+
+def feed_response(request, scope, fmt):
+    """Ответ с лентой scope в формате fmt (rss или atom)."""
+    if fmt not in FORMATS:
+        raise Http404
+    # лента общая для всех запросов, поэтому ссылки в ней строятся
+    # от SITE_URL, а не от хоста запроса, который её построил
+    base = settings.SITE_URL.rstrip('/')
+    state = single_flight(
+        feed_key(scope, fmt),
+        lambda: build_feed(scope, fmt, base, base + request.path),
+        settings.FEED_CACHE_TIMEOUT, name='feed'
+    )
+    response = get_conditional_response(
+        request, etag=state['etag'], last_modified=state['last_modified']
+    )
+    if response is None:
+        response = HttpResponse(
+            state['body'], content_type=FORMATS[fmt].content_type
+        )
+    response['ETag'] = state['etag']
+    if state['last_modified'] is not None:
+        response['Last-Modified'] = http_date(state['last_modified'])
+    return response
+
+
+def post_scopes(author_id, *group_ids):
+    return ['site', f'author:{author_id}'] + [
+        f'group:{group_id}' for group_id in group_ids if group_id
+    ]
+
+
+def author_scopes(author_id):
+    """Ленты, в записях которых указано имя автора."""
+    group_ids = GroupAuthorStats.objects.filter(
+        author_id=author_id, post_count__gt=0
+    ).values_list('group_id', flat=True)
+    return post_scopes(author_id, *group_ids)
+
+
+def group_scopes(group_id):
+    """Ленты, в записях которых указано название группы."""
+    author_ids = GroupAuthorStats.objects.filter(
+        group_id=group_id, post_count__gt=0
+    ).values_list('author_id', flat=True)
+    return ['site', f'group:{group_id}'] + [
+        f'author:{author_id}' for author_id in author_ids
+    ]
+
+
+def append_post(scope, fmt, post):
+    key = feed_key(scope, fmt)
+    lock_key = f'lock:{key}'
+    if not cache.add(lock_key, 1, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        # ленту сейчас строят или дополняют, пусть построят заново
+        bump_cache_version(f'syndication:{scope}')
+        return
+    try:
+        state = cache.get(key)
+        if state is None or any(
+            pk == post.pk for pk, _, _ in state['entries']
+        ):
+            return
+        entry = (post.pk, post.created,
+                 render_entry(fmt, state['meta'], post, state['base']))
+        state['entries'] = [entry] + state['entries'][
+            :settings.FEED_ITEMS - 1
+        ]
+        cache.set(key, assemble(fmt, state), settings.FEED_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+def post_published(post):
+    """Дописывает новый пост в построенные ленты."""
+    for scope in post_scopes(post.author_id, post.group_id):
+        for fmt in FORMATS:
+            append_post(scope, fmt, post)
+
+
+def invalidate(*scopes):
+    """Сбрасывает ленты после фиксации транзакции: иначе опрос до неё
+    построил бы ленту по старым данным под новой версией."""
+    transaction.on_commit(lambda: bump_cache_version(
+        *(f'syndication:{scope}' for scope in scopes)
+    ))
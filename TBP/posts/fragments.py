@@ -0,0 +1,62 @@
+"""Фрагменты страниц постов, зависящие от пользователя."""
+from django.template.loader import render_to_string
+
+from core.page_cache import fragment
+from .forms import CommentForm
+from .models import Follow
+
+
+@fragment
+def feed_switcher(request, calls):
+    """Вкладки «Все авторы» и «Избранные авторы» для вошедших."""
+    html = render_to_string(
+        'includes/switcher.html', {'index': True}, request=request
+    )
+    return {args: html for args in calls}
+
+
+@fragment
+def follow_button(request, calls):
+    """Кнопка подписки на автора; аргументы: id и имя автора."""
+    following = set()
+    if request.user.is_authenticated:
+        following = set(Follow.objects.filter(
+            user=request.user,
+            author_id__in=[author_id for author_id, _ in calls]
+        ).values_list('author_id', flat=True))
+    return {
+        (author_id, username): render_to_string(
+            'includes/follow_button.html',
+            {
+                'username': username,
+                'following': int(author_id) in following,
+            }
+        )
+        for author_id, username in calls
+    }
+
+
+@fragment
+def edit_link(request, calls):
+    """Ссылка редактирования поста; аргументы: id поста и автора."""
+    return {
+        (post_id, author_id): render_to_string(
+            'includes/edit_link.html', {'post_id': post_id}
+        ) if str(request.user.pk) == author_id else ''
+        for post_id, author_id in calls
+    }
+
+
+@fragment
+def comment_form(request, calls):
+    """Форма комментария с CSRF-токеном; аргумент: id поста."""
+    if not request.user.is_authenticated:
+        return {args: '' for args in calls}
+    return {
+        (post_id,): render_to_string(
+            'includes/comment_form.html',
+            {'form': CommentForm(), 'post_id': post_id},
+            request=request
+        )
+        for post_id, in calls
+    }
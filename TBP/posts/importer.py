@@ -0,0 +1,272 @@
+"""Потоковый импорт постов, комментариев и подписок.
+
+Записи читаются по одной из JSON Lines или CSV и вставляются пачками
+через bulk_create, так что потребление памяти не зависит от размера
+входного файла.
+
+Формат записей::
+
+    {"type": "post", "id": 10, "author": "ivan", "group": "cats",
+     "text": "...", "created": "2020-01-01T10:00:00+00:00"}
+    {"type": "comment", "post": 10, "author": "petr", "text": "..."}
+    {"type": "follow", "user": "petr", "author": "ivan"}
+
+Поля id, group, created и image необязательны. Комментарий ссылается
+на id поста, поэтому посты со своими комментариями переносятся с
+исходными id.
+"""
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, Group, Comment, Follow, User, make_excerpt
+
+
+class LookupCache:
+    """Кэш «имя -> id» ограниченного размера (вытесняет самые старые)."""
+
+    def __init__(self, resolve, maxsize=100000):
+        self.resolve = resolve
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key):
+        try:
+            self.data.move_to_end(key)
+            return self.data[key]
+        except KeyError:
+            pass
+        value = self.resolve(key)
+        if value is not None:
+            self.data[key] = value
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value
+
+
+@contextmanager
+def keep_created_dates(*models):
+    """Отключает auto_now_add, чтобы сохранить исходные даты записей."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def tuned_connection():
+    """Настройки SQLite на время массовой вставки."""
+    # внутри транзакции SQLite не даёт менять synchronous
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.execute('PRAGMA cache_size = -65536')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+def read_records(path, default_type=None):
+    """Читает записи из .jsonl или .csv файла по одной."""
+    with open(path, encoding='utf-8', newline='') as source:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(source):
+                row.setdefault('type', default_type)
+                yield row
+        else:
+            for line in source:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    record.setdefault('type', default_type)
+                    yield record
+
+
+def parse_created(record):
+    """Дата из записи, а если её нет, время импорта."""
+    return parse_datetime(record.get('created') or '') or timezone.now()
+
+
+def import_key(obj):
+    """Поля, по которым объект совпадает с уже загруженной записью.
+
+    Посты с id сравниваются по id, без id — по автору и тексту.
+    Комментарии обычно приходят без id и сравниваются по посту,
+    автору и тексту, подписки — по паре читатель и автор.
+    """
+    if isinstance(obj, Post):
+        fields = ('id',) if obj.pk is not None else ('author_id', 'text')
+    elif isinstance(obj, Comment):
+        fields = ('post_id', 'author_id', 'text')
+    else:
+        fields = ('user_id', 'author_id')
+    return fields, tuple(getattr(obj, field) for field in fields)
+
+
+def new_objects(model, objs, chunk_size=300):
+    """Объекты пачки без записей, уже загруженных в базу, и без
+    повторов внутри пачки (см. import_key)."""
+    by_fields = {}
+    for obj in objs:
+        fields, key = import_key(obj)
+        by_fields.setdefault(fields, set()).add(key)
+    existing = set()
+    for fields, keys in by_fields.items():
+        keys = list(keys)
+        for start in range(0, len(keys), chunk_size):
+            query = Q()
+            for key in keys[start:start + chunk_size]:
+                query |= Q(**dict(zip(fields, key)))
+            existing.update(
+                (fields, key)
+                for key in model.objects.filter(query).values_list(*fields)
+            )
+    result = []
+    for obj in objs:
+        fields_key = import_key(obj)
+        if fields_key not in existing:
+            existing.add(fields_key)
+            result.append(obj)
+    return result
+
+
+class Importer:
+    def __init__(self, batch_size=1000, create_missing=False,
+                 checkpoint_path=None, report=None):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.checkpoint_path = checkpoint_path
+        self.report = report or (lambda message: None)
+        self.users = LookupCache(self.resolve_user)
+        self.groups = LookupCache(self.resolve_group)
+        self.buffers = {Post: [], Comment: [], Follow: []}
+        self.position = 0
+        self.imported = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.started = time.monotonic()
+
+    def resolve_user(self, username):
+        pk = User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        ).first()
+        if pk is None and self.create_missing:
+            pk = User.objects.create_user(username=username,
+                                          is_active=False).pk
+        return pk
+
+    def resolve_group(self, slug):
+        pk = Group.objects.filter(slug=slug).values_list(
+            'pk', flat=True
+        ).first()
+        if pk is None and self.create_missing:
+            pk = Group.objects.create(title=slug, slug=slug).pk
+        return pk
+
+    def build(self, record):
+        """Создаёт несохранённый объект модели из записи или None."""
+        kind = record.get('type')
+        if kind == 'post':
+            author_id = self.users.get(record['author'])
+            if author_id is None:
+                return None
+            group = record.get('group')
+            return Post(
+                id=record.get('id') or None,
+                text=record['text'],
+                excerpt=make_excerpt(record['text']),
+                author_id=author_id,
+                group_id=self.groups.get(group) if group else None,
+                image=record.get('image') or '',
+                created=parse_created(record),
+                followers_notified=True,
+            )
+        if kind == 'comment':
+            author_id = self.users.get(record['author'])
+            if author_id is None:
+                return None
+            return Comment(
+                post_id=int(record['post']),
+                author_id=author_id,
+                text=record['text'],
+                created=parse_created(record),
+            )
+        if kind == 'follow':
+            user_id = self.users.get(record['user'])
+            author_id = self.users.get(record['author'])
+            if user_id is None or author_id is None or user_id == author_id:
+                return None
+            return Follow(user_id=user_id, author_id=author_id)
+        return None
+
+    def run(self, records, resume_from=0):
+        """Импортирует записи, пропуская первые resume_from."""
+        self.position = resume_from
+        with tuned_connection(), keep_created_dates(Post, Comment):
+            for number, record in enumerate(records):
+                if number < resume_from:
+                    continue
+                obj = self.build(record)
+                if obj is None:
+                    self.skipped += 1
+                else:
+                    self.buffers[type(obj)].append(obj)
+                self.position = number + 1
+                if sum(map(len, self.buffers.values())) >= self.batch_size:
+                    self.flush()
+            self.flush()
+        return self.imported, self.skipped + self.duplicates
+
+    def flush(self):
+        """Сохраняет накопленную пачку одной транзакцией."""
+        with transaction.atomic():
+            for model, objs in self.buffers.items():
+                if objs:
+                    created = new_objects(model, objs)
+                    model.objects.bulk_create(created, ignore_conflicts=True)
+                    self.imported += len(created)
+                    self.duplicates += len(objs) - len(created)
+                    objs.clear()
+        self.save_checkpoint()
+        elapsed = time.monotonic() - self.started
+        rate = self.imported / elapsed if elapsed else 0
+        self.report(
+            f'Обработано записей: {self.position}, импортировано: '
+            f'{self.imported}, пропущено: {self.skipped}, '
+            f'уже были в базе: {self.duplicates}, {rate:.0f} строк/с'
+        )
+
+    def save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        temporary = self.checkpoint_path + '.tmp'
+        with open(temporary, 'w') as checkpoint:
+            checkpoint.write(str(self.position))
+        os.replace(temporary, self.checkpoint_path)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as checkpoint:
+            return int(checkpoint.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_old_posts, table_stats
+
+
+class Command(BaseCommand):
+    help = 'Перенести старые посты и их комментарии в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше указанного числа дней.'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Только показать размер горячих и архивных таблиц.'
+        )
+
+    def handle(self, *args, **options):
+        self.print_stats()
+        if options['stats']:
+            return
+        archived = archive_old_posts(options['days'], options['batch_size'])
+        self.stdout.write(f'Перенесено в архив постов: {archived}')
+        self.print_stats()
+
+    def print_stats(self):
+        for table, (rows, size) in table_stats().items():
+            size = f'{size} байт' if size is not None else 'размер неизвестен'
+            self.stdout.write(f'{table}: {rows} строк, {size}')
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.comments import save_comment
+from posts.models import Comment, Post, User
+
+BENCH_TEXT = 'bench_comments'
+
+
+class Command(BaseCommand):
+    help = ('Сравнить число комментариев в секунду при обычной записи '
+            'и при групповой фиксации (COMMENT_GROUP_COMMIT). '
+            'Записанные комментарии удаляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument(
+            '--count', type=int, default=50,
+            help='Комментариев на поток.'
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by('pk').first()
+        author = User.objects.order_by('pk').first()
+        if post is None or author is None:
+            self.stderr.write('Нужны хотя бы один пост и пользователь.')
+            return
+        try:
+            for group_commit in (False, True):
+                with override_settings(COMMENT_GROUP_COMMIT=group_commit):
+                    self.bench(
+                        post, author, options['threads'], options['count'],
+                        'групповая фиксация' if group_commit else 'обычная'
+                    )
+        finally:
+            Comment.objects.filter(text=BENCH_TEXT).delete()
+
+    def bench(self, post, author, threads, count, mode):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(count):
+                    try:
+                        save_comment(Comment(
+                            post=post, author=author, text=BENCH_TEXT
+                        ))
+                    except Exception as error:
+                        errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        duration = time.perf_counter() - started
+        written = threads * count - len(errors)
+        self.stdout.write(
+            f'{mode}: {written} комментариев за {duration:.2f} с, '
+            f'{written / duration:.0f} в секунду, ошибок {len(errors)}'
+        )
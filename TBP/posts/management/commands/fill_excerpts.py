@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, ArchivedPost, make_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Заполнить начало текста (excerpt) у постов, где оно пустое.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Post, ArchivedPost):
+            filled = self.fill(model, options['batch_size'])
+            self.stdout.write(f'{model.__name__}: заполнено {filled}')
+
+    def fill(self, model, batch_size):
+        posts = model.objects.filter(excerpt='').exclude(text='').order_by(
+            'pk'
+        ).only('pk', 'text')
+        last_pk, filled = 0, 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return filled
+            for post in batch:
+                post.excerpt = make_excerpt(post.text)
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['excerpt'])
+            filled += len(batch)
+            last_pk = batch[-1].pk
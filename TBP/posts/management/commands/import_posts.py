@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_cache_version
+from posts.importer import Importer, read_records, load_checkpoint
+from posts.stats import rebuild_group_stats
+
+
+class Command(BaseCommand):
+    help = ('Импорт постов, комментариев и подписок из файла '
+            'JSON Lines (.jsonl) или CSV (.csv).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--type', choices=('post', 'comment', 'follow'),
+            help='Тип записей, если он не указан в самих записях (CSV).'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы.'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с сохранённой контрольной точки.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint_path = path + '.checkpoint'
+        resume_from = load_checkpoint(checkpoint_path) \
+            if options['resume'] else 0
+        importer = Importer(
+            batch_size=options['batch_size'],
+            create_missing=options['create_missing'],
+            checkpoint_path=checkpoint_path,
+            report=self.stdout.write,
+        )
+        imported, skipped = importer.run(
+            read_records(path, options['type']), resume_from=resume_from
+        )
+        # bulk_create не отправляет сигналы, поэтому статистику групп
+        # пересчитываем, а кэш страниц сбрасываем целиком
+        rebuild_group_stats()
+        bump_cache_version('pages')
+        self.stdout.write(
+            f'Готово. Импортировано: {imported}, пропущено: {skipped} '
+            f'(в том числе уже были в базе: {importer.duplicates})'
+        )
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import (
+    build_recommendations, save_recommendations
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать рекомендации авторов для подписки.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = save_recommendations(build_recommendations())
+        self.stdout.write(
+            f'Рекомендации посчитаны для {count - 1} читателей '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_follower_digests
+
+
+class Command(BaseCommand):
+    help = 'Разослать подписчикам дайджесты новых постов.'
+
+    def handle(self, *args, **options):
+        sent, posts_count, rate = send_follower_digests()
+        self.stdout.write(
+            f'Постов: {posts_count}, писем: {sent}, '
+            f'{rate:.0f} получателей/с'
+        )
@@ -0,0 +1,159 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Post, GroupStats, User
+from posts.tasks import make_post_thumbnail
+
+
+class RateLimiter:
+    """Не больше rate вызовов wait() в секунду на все потоки."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def page_urls(url, pages):
+    return [url] + [f'{url}?page={number}' for number in range(2, pages + 1)]
+
+
+def hot_groups(limit):
+    """Самые активные группы."""
+    return list(GroupStats.objects.order_by('-last_post_at').values_list(
+        'group_id', 'group__slug'
+    )[:limit])
+
+
+def hot_authors(limit):
+    """Авторы с наибольшим числом подписчиков."""
+    return list(User.objects.annotate(
+        followers=Count('following')
+    ).order_by('-followers').values_list('pk', 'username')[:limit])
+
+
+def hot_urls(pages, groups, authors):
+    """Первые страницы главной, самых активных групп и профилей
+    самых популярных авторов."""
+    urls = page_urls(reverse('posts:index'), pages)
+    urls.append(reverse('posts:group_index'))
+    for _, slug in groups:
+        urls += page_urls(
+            reverse('posts:group_list', kwargs={'slug': slug}), pages
+        )
+    for _, username in authors:
+        urls += page_urls(
+            reverse('posts:profile', kwargs={'username': username}), pages
+        )
+    return urls
+
+
+def hot_posts(pages, groups, authors):
+    """Посты с картинками, которые видны на прогреваемых страницах."""
+    limit = pages * settings.POSTS_IN_PAGE
+    with_image = Post.objects.exclude(image='').values_list('pk', flat=True)
+    post_ids = set(with_image[:limit])
+    for group_id, _ in groups:
+        post_ids.update(with_image.filter(group_id=group_id)[:limit])
+    for author_id, _ in authors:
+        post_ids.update(with_image.filter(author_id=author_id)[:limit])
+    return Post.objects.filter(pk__in=post_ids).only('pk', 'image')
+
+
+def fetch_http(url):
+    """Статус ответа работающего сайта или None, если он недоступен."""
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except urllib.error.URLError:
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Прогреть кэш после выкладки: отрисовать самые посещаемые '
+            'страницы и создать миниатюры их картинок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько первых страниц каждой ленты.')
+        parser.add_argument('--groups', type=int, default=20,
+                            help='Сколько самых активных групп.')
+        parser.add_argument('--authors', type=int, default=20,
+                            help='Сколько авторов с наибольшим числом '
+                                 'подписчиков.')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rate', type=float, default=10,
+                            help='Не больше запросов в секунду '
+                                 '(0 — без ограничения).')
+        parser.add_argument(
+            '--base-url',
+            help='Запрашивать страницы у работающего сайта по HTTP, '
+                 'например http://127.0.0.1:8000. Без него страницы '
+                 'рендерятся в этом процессе, что прогревает только '
+                 'общий для процессов кэш.'
+        )
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        groups = hot_groups(options['groups'])
+        authors = hot_authors(options['authors'])
+        limiter = RateLimiter(options['rate'])
+        started = time.monotonic()
+
+        posts = list(hot_posts(pages, groups, authors))
+        with ThreadPoolExecutor(options['workers']) as executor:
+            list(executor.map(self.thumbnail, posts))
+        self.stdout.write(f'Миниатюр проверено: {len(posts)}')
+
+        urls = hot_urls(pages, groups, authors)
+        local = threading.local()
+        base_url = options['base_url']
+
+        def fetch(url):
+            limiter.wait()
+            if base_url:
+                return fetch_http(base_url + url)
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            try:
+                return local.client.get(url).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(options['workers']) as executor:
+            statuses = list(executor.map(fetch, urls))
+        failed = sum(1 for status in statuses if status != 200)
+        self.stdout.write(
+            f'Страниц прогрето: {len(urls) - failed}, с ошибкой: {failed}, '
+            f'{time.monotonic() - started:.1f} с'
+        )
+
+    @staticmethod
+    def thumbnail(post):
+        try:
+            make_post_thumbnail(post)
+        finally:
+            connection.close()
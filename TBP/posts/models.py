@@ -1,14 +1,35 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.text import Truncator
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 300
+
+# Поля, которые выводит includes/post_frame.html
+FEED_FIELDS = (
+    'id', 'created', 'excerpt', 'image', 'author_id', 'group_id',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug',
+)
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Только поля, нужные карточке поста в ленте, без полного текста."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
 
 class CreatedModel(models.Model):
     """Абстрактная модель. Добавляет дату создания."""
     created = models.DateTimeField(
         'Дата создания',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True
     )
 
     class Meta:
@@ -26,6 +47,12 @@ class Group(models.Model):
 
 class Post(CreatedModel):
     text = models.TextField()
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -45,12 +72,27 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    followers_notified = models.BooleanField(
+        'Подписчики уведомлены',
+        default=False,
+        db_index=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['group', '-created'])]
 
 
 class Comment(CreatedModel):
@@ -78,3 +120,128 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class DigestProgress(models.Model):
+    """Незаконченная рассылка дайджестов (posts.notifications).
+
+    Если рассылка упала, повтор берёт те же посты и продолжает
+    с подписчика после last_user_id, не отправляя письма повторно.
+    """
+    posts = models.TextField('id постов (JSON)')
+    last_user_id = models.IntegerField('Последний получатель', default=0)
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из posts_post командой archive_posts.
+
+    id совпадает с id исходного поста, поэтому ссылки не меняются.
+    """
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания', db_index=True)
+    text = models.TextField()
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True,
+        null=True
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    def __str__(self):
+        return self.text[:15]
+
+    class Meta:
+        ordering = ['-created']
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивного поста."""
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField()
+
+
+class GroupStats(models.Model):
+    """Заранее посчитанная статистика группы для каталога групп."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последний пост',
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    active_authors = models.PositiveIntegerField('Авторов', default=0)
+
+
+class GroupAuthorStats(models.Model):
+    """Число постов автора в группе, нужно для подсчёта авторов."""
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_stats'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_stats'
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'author'], name='unique_group_author'
+            ),
+        ]
+
+
+class FollowRecommendations(models.Model):
+    """Авторы для подписки, посчитанные командой recommend_follows.
+
+    authors — упакованный массив id (posts.recommendations.pack),
+    строка с user_id 0 — популярные авторы для остальных читателей.
+    """
+    user_id = models.IntegerField(primary_key=True)
+    authors = models.BinaryField()
@@ -0,0 +1,128 @@
+"""Рассылка подписчикам дайджестов с новыми постами авторов."""
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DigestProgress, Post, Follow, User
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SUBJECT = 'Новые посты авторов, на которых вы подписаны'
+
+
+def format_digest(posts):
+    lines = []
+    for post in posts:
+        url = settings.SITE_URL + reverse(
+            'posts:post_detail', kwargs={'post_id': post['pk']}
+        )
+        lines.append(
+            f"{post['author__username']}: {post['text'][:100]}\n{url}"
+        )
+    return '\n\n'.join(lines)
+
+
+def iter_recipients(posts_by_author, after=0):
+    """Отдаёт (user_id, посты) по одному на подписчика с id больше after.
+
+    Подписки читаются потоком, отсортированными по подписчику, так что
+    все авторы одного получателя идут подряд и склеиваются в один
+    дайджест без загрузки всех подписчиков в память.
+    """
+    follows = Follow.objects.filter(
+        author_id__in=posts_by_author, user_id__gt=after
+    ).order_by('user_id').values_list('user_id', 'author_id')
+    current_user, current_posts = None, []
+    for user_id, author_id in follows.iterator(
+        chunk_size=settings.NOTIFY_BATCH_SIZE
+    ):
+        if user_id != current_user:
+            if current_posts:
+                yield current_user, current_posts
+            current_user, current_posts = user_id, []
+        current_posts.extend(posts_by_author[author_id])
+    if current_posts:
+        yield current_user, current_posts
+
+
+def send_batch(batch):
+    """Отправляет дайджесты пачки получателей через одно соединение."""
+    emails = dict(
+        User.objects.filter(pk__in=[user_id for user_id, _ in batch])
+        .exclude(email='').values_list('pk', 'email')
+    )
+    messages = [
+        EmailMessage(DIGEST_SUBJECT, format_digest(posts), to=[emails[uid]])
+        for uid, posts in batch if uid in emails
+    ]
+    if not messages:
+        return 0
+    with get_connection() as connection:
+        return connection.send_messages(messages) or 0
+
+
+def send_follower_digests():
+    """Рассылает дайджесты по постам, о которых подписчики ещё не знают.
+
+    После каждой пачки запоминается последний получатель
+    (DigestProgress), так что повтор упавшей рассылки продолжает с места
+    остановки. Возвращает число отправленных писем, обработанных постов
+    и скорость рассылки в получателях в секунду.
+    """
+    started = time.monotonic()
+    progress = DigestProgress.objects.first()
+    if progress is None:
+        # старые посты (например, созданные до включения рассылки)
+        # пропускаем
+        since = timezone.now() - timedelta(seconds=settings.NOTIFY_MAX_AGE)
+        pks = list(
+            Post.objects.filter(followers_notified=False, created__gte=since)
+            .order_by('pk').values_list('pk', flat=True)
+            [:settings.NOTIFY_MAX_POSTS]
+        )
+        progress = DigestProgress.objects.create(posts=json.dumps(pks))
+    posts = list(
+        Post.objects.filter(pk__in=json.loads(progress.posts))
+        .order_by('pk')
+        .values('pk', 'author_id', 'author__username', 'text')
+    )
+    posts_by_author = defaultdict(list)
+    for post in posts:
+        posts_by_author[post['author_id']].append(post)
+
+    def send(batch):
+        count = send_batch(batch)
+        progress.last_user_id = batch[-1][0]
+        progress.save(update_fields=('last_user_id',))
+        return count
+
+    sent, batch = 0, []
+    recipients = iter_recipients(posts_by_author, progress.last_user_id)
+    for recipient in recipients:
+        batch.append(recipient)
+        if len(batch) >= settings.NOTIFY_BATCH_SIZE:
+            sent += send(batch)
+            batch = []
+    if batch:
+        sent += send(batch)
+
+    with transaction.atomic():
+        Post.objects.filter(pk__in=[post['pk'] for post in posts]).update(
+            followers_notified=True
+        )
+        progress.delete()
+    elapsed = time.monotonic() - started
+    rate = sent / elapsed if elapsed else 0
+    logger.info(
+        'Дайджесты: %s писем по %s постам, %.0f получателей/с',
+        sent, len(posts), rate
+    )
+    return sent, len(posts), rate
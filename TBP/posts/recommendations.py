@@ -0,0 +1,200 @@
+"""Рекомендации авторов для подписки.
+
+Считаются командой recommend_follows сразу для всех читателей, а не
+при запросе. Граф подписок загружается в память разреженно: для
+каждого читателя — множество авторов. Похожесть двух авторов —
+косинусная мера по общим подписчикам. Читателю предлагаются авторы,
+похожие на тех, кого он читает, и активные авторы групп, где пишут
+его авторы. Результат хранится по строке на читателя с упакованными
+id авторов, страница получает его одним запросом по ключу.
+"""
+import heapq
+import math
+from array import array
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, FollowRecommendations, GroupAuthorStats, User
+
+# строка для читателей, для которых ничего не посчитано
+POPULAR = 0
+
+
+def pack(ids):
+    return array('I', ids).tobytes()
+
+
+def unpack(data):
+    ids = array('I')
+    ids.frombytes(bytes(data))
+    return ids.tolist()
+
+
+def load_follows():
+    """{читатель: {авторы}} по таблице подписок."""
+    follows = defaultdict(set)
+    edges = Follow.objects.values_list('user_id', 'author_id').iterator(
+        chunk_size=10000
+    )
+    for user_id, author_id in edges:
+        follows[user_id].add(author_id)
+    return follows
+
+
+def load_groups(limit):
+    """Доли постов автора по группам: {автор: {группа: доля}}
+    и limit самых активных авторов группы: {группа: [(доля, автор)]}."""
+    author_totals = defaultdict(int)
+    group_totals = defaultdict(int)
+    stats = list(GroupAuthorStats.objects.values_list(
+        'author_id', 'group_id', 'post_count'
+    ).iterator())
+    for author_id, group_id, post_count in stats:
+        author_totals[author_id] += post_count
+        group_totals[group_id] += post_count
+    author_groups = defaultdict(dict)
+    group_authors = defaultdict(list)
+    for author_id, group_id, post_count in stats:
+        if not post_count:
+            continue
+        author_groups[author_id][group_id] = (
+            post_count / author_totals[author_id]
+        )
+        group_authors[group_id].append(
+            (post_count / group_totals[group_id], author_id)
+        )
+    return author_groups, {
+        group_id: heapq.nlargest(limit, authors)
+        for group_id, authors in group_authors.items()
+    }
+
+
+def author_neighbours(follows, limit):
+    """Число подписчиков авторов и limit самых похожих авторов для
+    каждого: {автор: [(похожесть, автор)]}."""
+    followers = defaultdict(int)
+    co_follows = defaultdict(lambda: defaultdict(int))
+    for authors in follows.values():
+        for author in authors:
+            followers[author] += 1
+        # у читателя с тысячами подписок пар слишком много
+        authors = sorted(authors)[:settings.RECOMMEND_MAX_FOLLOWS]
+        for author in authors:
+            row = co_follows[author]
+            for other in authors:
+                if other != author:
+                    row[other] += 1
+    neighbours = {}
+    for author, row in co_follows.items():
+        norm = followers[author]
+        neighbours[author] = heapq.nlargest(limit, (
+            (count / math.sqrt(norm * followers[other]), other)
+            for other, count in row.items()
+        ))
+    return followers, neighbours
+
+
+def recommend(authors, neighbours, author_groups, group_authors):
+    """Оценки кандидатов для читателя, подписанного на authors."""
+    scores = defaultdict(float)
+    for author in authors:
+        for similarity, other in neighbours.get(author, ()):
+            scores[other] += similarity
+    affinity = defaultdict(float)
+    for author in authors:
+        for group_id, share in author_groups.get(author, {}).items():
+            affinity[group_id] += share / len(authors)
+    weight = settings.RECOMMEND_GROUP_WEIGHT
+    for group_id, group_affinity in affinity.items():
+        for share, other in group_authors.get(group_id, ()):
+            scores[other] += weight * group_affinity * share
+    return scores
+
+
+def build_recommendations():
+    """Считает рекомендации для всех читателей.
+
+    Возвращает пары (id читателя, [id авторов]); первая пара —
+    популярные авторы для читателей без подписок. Всё считается до
+    записи, чтобы не держать транзакцию открытой.
+    """
+    limit = settings.RECOMMEND_AUTHORS
+    follows = load_follows()
+    followers, neighbours = author_neighbours(
+        follows, settings.RECOMMEND_NEIGHBOURS
+    )
+    author_groups, group_authors = load_groups(settings.RECOMMEND_NEIGHBOURS)
+    popular = [author for author, _ in heapq.nlargest(
+        2 * limit, followers.items(), key=lambda item: (item[1], -item[0])
+    )]
+    rows = [(POPULAR, popular)]
+    for user_id, authors in follows.items():
+        scores = recommend(authors, neighbours, author_groups, group_authors)
+        ranked = [
+            author for author, _ in heapq.nlargest(
+                limit + len(authors) + 1, scores.items(), key=itemgetter(1)
+            )
+        ]
+        # кандидатов мало — добираем популярными
+        chosen = []
+        for author in ranked + popular:
+            if (author != user_id and author not in authors
+                    and author not in chosen):
+                chosen.append(author)
+                if len(chosen) == limit:
+                    break
+        rows.append((user_id, chosen))
+    return rows
+
+
+def save_recommendations(rows, batch_size=500):
+    """Заменяет все рекомендации новыми, возвращает число строк.
+
+    Каждая пачка строк записывается своей транзакцией, чтобы не
+    держать блокировку записи всё время замены; читатели в это время
+    видят старые или новые рекомендации. В конце удаляются строки
+    читателей, для которых ничего не посчитано.
+    """
+    saved = set()
+    rows = iter(rows)
+    while True:
+        batch = [
+            FollowRecommendations(user_id=user_id, authors=pack(ids))
+            for user_id, ids in islice(rows, batch_size)
+        ]
+        if not batch:
+            break
+        user_ids = [row.user_id for row in batch]
+        with transaction.atomic():
+            FollowRecommendations.objects.filter(
+                user_id__in=user_ids
+            ).delete()
+            FollowRecommendations.objects.bulk_create(batch)
+        saved.update(user_ids)
+    stale = sorted(set(FollowRecommendations.objects.values_list(
+        'user_id', flat=True
+    ).iterator()) - saved)
+    for start in range(0, len(stale), batch_size):
+        FollowRecommendations.objects.filter(
+            user_id__in=stale[start:start + batch_size]
+        ).delete()
+    return len(saved)
+
+
+def recommended_authors(user, limit):
+    """До limit авторов, на которых user ещё не подписан."""
+    rows = dict(FollowRecommendations.objects.filter(
+        user_id__in=(user.pk, POPULAR)
+    ).values_list('user_id', 'authors'))
+    data = rows.get(user.pk, rows.get(POPULAR))
+    if data is None:
+        return []
+    ids = unpack(data)
+    authors = User.objects.filter(pk__in=ids).exclude(pk=user.pk).exclude(
+        following__user=user
+    ).in_bulk()
+    return [authors[pk] for pk in ids if pk in authors][:limit]
@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from core.cache import bump_cache_version
+from . import autocomplete, feeds
+from .models import Post, Group, GroupStats, Comment, Follow, User
+from .stats import post_added, post_removed
+
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def bump_post_pages(post, *group_ids):
+    """Инвалидирует кэш страниц, на которых виден пост."""
+    bump_cache_version(
+        'feed',
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+        *(f'group:{group_id}' for group_id in group_ids if group_id)
+    )
+
+
+def count_group_post(group_id, delta):
+    if group_id:
+        autocomplete.score_changed('group', group_id, delta)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+    else:
+        feeds.invalidate(*feeds.group_scopes(instance.pk))
+    autocomplete.group_changed(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    autocomplete.removed('group', instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields, **kwargs):
+    """Отмечает, изменились ли имена пользователя: от них зависят
+    индекс автодополнения и ленты."""
+    names = tuple(getattr(instance, field) for field in USER_NAME_FIELDS)
+    if instance.pk is None:
+        instance._names_changed = True
+    elif update_fields is not None and not set(update_fields) & set(
+        USER_NAME_FIELDS
+    ):
+        # например, обновление last_login при входе
+        instance._names_changed = False
+    else:
+        instance._names_changed = names != User.objects.filter(
+            pk=instance.pk
+        ).values_list(*USER_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not getattr(instance, '_names_changed', True):
+        return
+    if not created:
+        feeds.invalidate(*feeds.author_scopes(instance.pk))
+    autocomplete.user_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.removed('user', instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def count_follower(sender, instance, created, **kwargs):
+    if created:
+        autocomplete.score_changed('user', instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follower(sender, instance, **kwargs):
+    autocomplete.score_changed('user', instance.author_id, -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу поста, чтобы учесть перенос."""
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        post_added(instance.group_id, instance.author_id, instance.created)
+        count_group_post(instance.group_id, 1)
+        transaction.on_commit(lambda: feeds.post_published(instance))
+    elif previous_group_id != instance.group_id:
+        post_removed(previous_group_id, instance.author_id)
+        post_added(instance.group_id, instance.author_id, instance.created)
+        count_group_post(previous_group_id, -1)
+        count_group_post(instance.group_id, 1)
+    if not created:
+        feeds.invalidate(*feeds.post_scopes(
+            instance.author_id, instance.group_id, previous_group_id
+        ))
+    bump_post_pages(instance, instance.group_id, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def update_stats_on_delete(sender, instance, **kwargs):
+    post_removed(instance.group_id, instance.author_id)
+    count_group_post(instance.group_id, -1)
+    feeds.invalidate(*feeds.post_scopes(
+        instance.author_id, instance.group_id
+    ))
+    bump_post_pages(instance, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_pages(sender, instance, **kwargs):
+    bump_cache_version(f'post:{instance.post_id}')
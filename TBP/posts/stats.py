@@ -0,0 +1,104 @@
+"""Инкрементальное обновление статистики групп (GroupStats)."""
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+
+from .models import Post, Group, GroupStats, GroupAuthorStats
+
+
+def post_added(group_id, author_id, created):
+    """Учитывает новый пост группы."""
+    if group_id is None:
+        return
+    with transaction.atomic():
+        GroupStats.objects.get_or_create(group_id=group_id)
+        author_stats, _ = GroupAuthorStats.objects.select_for_update(
+        ).get_or_create(group_id=group_id, author_id=author_id)
+        GroupAuthorStats.objects.filter(pk=author_stats.pk).update(
+            post_count=F('post_count') + 1
+        )
+        stats = GroupStats.objects.filter(group_id=group_id)
+        stats.update(
+            post_count=F('post_count') + 1,
+            active_authors=F('active_authors') + (
+                1 if author_stats.post_count == 0 else 0
+            ),
+        )
+        stats.filter(
+            Q(last_post_at__lt=created) | Q(last_post_at__isnull=True)
+        ).update(last_post_at=created)
+
+
+def post_removed(group_id, author_id):
+    """Учитывает удаление поста из группы (удаление или перенос)."""
+    if group_id is None:
+        return
+    with transaction.atomic():
+        author_stats = GroupAuthorStats.objects.select_for_update().filter(
+            group_id=group_id, author_id=author_id
+        ).first()
+        author_left = 0
+        if author_stats is not None:
+            if author_stats.post_count <= 1:
+                author_stats.delete()
+                author_left = 1
+            else:
+                GroupAuthorStats.objects.filter(pk=author_stats.pk).update(
+                    post_count=F('post_count') - 1
+                )
+        last_post_at = Post.objects.filter(group_id=group_id).aggregate(
+            last=Max('created')
+        )['last']
+        GroupStats.objects.filter(group_id=group_id, post_count__gt=0).update(
+            post_count=F('post_count') - 1,
+            active_authors=F('active_authors') - author_left,
+            last_post_at=last_post_at,
+        )
+
+
+def rebuild_group_stats(group_ids=None):
+    """Пересчитывает статистику групп целиком по таблице постов.
+
+    Нужна после массовых операций без сигналов (update, bulk_create).
+    """
+    posts = Post.objects.filter(group__isnull=False)
+    if group_ids is not None:
+        posts = posts.filter(group_id__in=group_ids)
+    with transaction.atomic():
+        author_stats = GroupAuthorStats.objects.all()
+        stats = GroupStats.objects.all()
+        if group_ids is not None:
+            author_stats = author_stats.filter(group_id__in=group_ids)
+            stats = stats.filter(group_id__in=group_ids)
+        author_stats.delete()
+        stats.delete()
+        GroupAuthorStats.objects.bulk_create(
+            GroupAuthorStats(
+                group_id=row['group_id'],
+                author_id=row['author_id'],
+                post_count=row['total'],
+            )
+            for row in posts.values('group_id', 'author_id').annotate(
+                total=Count('pk')
+            ).order_by()
+        )
+        GroupStats.objects.bulk_create(
+            GroupStats(
+                group_id=row['group_id'],
+                post_count=row['total'],
+                last_post_at=row['last'],
+                active_authors=row['authors'],
+            )
+            for row in posts.values('group_id').annotate(
+                total=Count('pk'),
+                last=Max('created'),
+                authors=Count('author_id', distinct=True),
+            ).order_by()
+        )
+        # группы без постов тоже должны попасть в каталог
+        groups = Group.objects.filter(stats__isnull=True)
+        if group_ids is not None:
+            groups = groups.filter(pk__in=group_ids)
+        GroupStats.objects.bulk_create(
+            GroupStats(group_id=pk)
+            for pk in groups.values_list('pk', flat=True)
+        )
@@ -0,0 +1,50 @@
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from core.cache import bump_cache_version
+from core.tasks import task, enqueue
+from .models import Post
+from .notifications import send_follower_digests
+
+# Должно совпадать с параметрами тега thumbnail в шаблонах
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def make_post_thumbnail(post):
+    """Создаёт миниатюру картинки поста, если её ещё нет."""
+    if post.image:
+        return get_thumbnail(
+            post.image, POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+        )
+    return None
+
+
+@task
+def post_saved(post_id):
+    """Побочная работа после создания или изменения поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    make_post_thumbnail(post)
+    if not post.followers_notified:
+        # посты, вышедшие за время задержки, попадут в один дайджест
+        enqueue(
+            follower_digests,
+            dedupe_key='follower_digests',
+            delay=settings.NOTIFY_DIGEST_DELAY
+        )
+
+
+@task
+def follow_changed(user_id, author_id):
+    """Побочная работа после подписки или отписки."""
+    bump_cache_version(f'follow:{user_id}', f'author:{author_id}')
+
+
+@task
+def follower_digests():
+    """Рассылка дайджестов подписчикам новых постов."""
+    _, posts_count, _ = send_follower_digests()
+    if posts_count >= settings.NOTIFY_MAX_POSTS:
+        enqueue(follower_digests, dedupe_key='follower_digests')
@@ -0,0 +1,53 @@
+from http import HTTPStatus
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..admin import process_in_batches
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='admin'
+        )
+        cls.admin_client = Client()
+        cls.admin_client.force_login(cls.admin)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='test-description',
+        )
+        for number in range(5):
+            Post.objects.create(
+                text=f'Тестовый текст {number}',
+                author=cls.admin,
+                group=cls.group,
+            )
+
+    def test_changelist_available(self):
+        """Список постов в админке открывается."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist')
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    @override_settings(ADMIN_BATCH_SIZE=2)
+    def test_remove_from_group_in_batches(self):
+        """Массовое действие обрабатывает все посты пачками."""
+        batches = []
+
+        def handler(batch):
+            batches.append(batch.count())
+            return batch.update(group=None)
+
+        updated = process_in_batches(Post.objects.all(), handler)
+        self.assertEqual(updated, 5)
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
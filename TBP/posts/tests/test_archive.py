@@ -0,0 +1,56 @@
+from datetime import timedelta
+from http import HTTPStatus
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_old_posts
+from ..models import Post, Comment, ArchivedPost, ArchivedComment
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='IvanIvanov')
+        cls.old_post = Post.objects.create(
+            text='Старый пост', author=cls.user
+        )
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            created=timezone.now() - timedelta(days=400)
+        )
+        Comment.objects.create(
+            post=cls.old_post, text='Старый комментарий', author=cls.user
+        )
+        cls.new_post = Post.objects.create(text='Новый пост', author=cls.user)
+
+    def test_old_posts_moved_to_archive(self):
+        """Старые посты с комментариями переносятся в архив."""
+        self.assertEqual(archive_old_posts(days=365), 1)
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(ArchivedPost.objects.filter(pk=self.old_post.pk))
+        self.assertEqual(ArchivedComment.objects.count(), 1)
+
+    def test_pages_read_through_archive(self):
+        """Просмотр поста и профиль показывают архивные посты."""
+        archive_old_posts(days=365)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old_post.pk})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(len(response.context['comments']), 1)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 2)
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            [self.new_post.pk, self.old_post.pk]
+        )
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from core.cache import get_cache_version
+from ..autocomplete import index
+from ..models import Post, Group, Follow
+
+User = get_user_model()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ivan = User.objects.create_user(
+            username='ivan', first_name='Иван', last_name='Петров'
+        )
+        cls.ivanov = User.objects.create_user(username='ivanov')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Иванов день', slug='ivan-day', description='-'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.ivanov)
+
+    def setUp(self):
+        # индекс общий для процесса, а база после теста откатывается
+        index.version = None
+
+    def labels(self, prefix):
+        return [item['label'] for item in index.lookup(prefix)]
+
+    def test_endpoint(self):
+        """Варианты ищутся по имени, фамилии, названию и slug группы,
+        авторы с подписчиками идут первыми."""
+        response = self.client.get(
+            reverse('posts:autocomplete'), {'q': 'IV'}
+        )
+        self.assertEqual(response.json()['results'], [
+            {'kind': 'user', 'label': 'ivanov', 'url': '/profile/ivanov/'},
+            {'kind': 'user', 'label': 'Иван Петров (ivan)',
+             'url': '/profile/ivan/'},
+            {'kind': 'group', 'label': 'Иванов день',
+             'url': '/group/ivan-day/'},
+        ])
+        self.assertEqual(self.labels('петр'), ['Иван Петров (ivan)'])
+        self.assertEqual(self.labels('ДЕНЬ'), ['Иванов день'])
+        self.assertEqual(self.labels('ivan-d'), ['Иванов день'])
+        self.assertEqual(self.labels('nobody'), [])
+        self.assertEqual(self.labels(' '), [])
+
+    def test_signals_update_index(self):
+        """Сохранения, подписки и посты сразу меняют варианты
+        и их порядок."""
+        self.labels('iv')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels('iva'), [
+                'ivanov', 'Иван Петров (ivan)', 'Иванов день',
+            ])
+        Follow.objects.create(user=self.reader, author=self.ivan)
+        Follow.objects.create(user=self.ivanov, author=self.ivan)
+        for _ in range(3):
+            Post.objects.create(text='-', author=self.ivan, group=self.group)
+        self.ivanov.username = 'sidorov'
+        self.ivanov.save()
+        User.objects.create_user(username='ivanka')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.labels('iv'), [
+                'Иванов день', 'Иван Петров (ivan)', 'ivanka',
+            ])
+            self.assertEqual(self.labels('sid'), ['sidorov'])
+        self.group.delete()
+        self.assertEqual(self.labels('iv'), ['Иван Петров (ivan)', 'ivanka'])
+
+    def test_login_keeps_index(self):
+        """Вход и сохранение без смены имён не сбрасывают индекс
+        в других процессах, смена имени сбрасывает после фиксации."""
+        version = get_cache_version('autocomplete')
+        # в TestCase on_commit не выполняется
+        with mock.patch.object(transaction, 'on_commit') as on_commit:
+            self.client.force_login(self.reader)
+            self.reader.email = 'reader@example.com'
+            self.reader.save()
+            on_commit.assert_not_called()
+            self.reader.first_name = 'Читатель'
+            self.reader.save()
+        self.assertEqual(get_cache_version('autocomplete'), version)
+        on_commit.assert_any_call(index.notify)
+        index.notify()
+        self.assertGreater(get_cache_version('autocomplete'), version)
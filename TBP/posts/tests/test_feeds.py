@@ -0,0 +1,140 @@
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, Group
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        # в TestCase транзакция теста не фиксируется, поэтому действия
+        # on_commit копятся здесь и выполняются вызовом commit()
+        self.on_commit = []
+        patcher = mock.patch.object(
+            transaction, 'on_commit', self.on_commit.append
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def commit(self):
+        while self.on_commit:
+            self.on_commit.pop(0)()
+
+    def test_feeds(self):
+        """Ленты сайта, группы и автора отдаются в RSS и Atom."""
+        urls = (
+            reverse('posts:site_feed', args=['rss']),
+            reverse('posts:group_feed', args=['test-slug', 'atom']),
+            reverse('posts:author_feed', args=['auth', 'rss']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Первый пост', response.content.decode())
+                self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(
+            response['Content-Type'], 'application/rss+xml; charset=utf-8'
+        )
+        for url in (reverse('posts:site_feed', args=['json']),
+                    reverse('posts:group_feed', args=['missing', 'rss'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_not_modified(self):
+        """Повторный опрос без изменений получает 304 без запросов
+        к базе."""
+        url = reverse('posts:site_feed', args=['atom'])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_appended(self):
+        """Новый пост дописывается в построенную ленту без её
+        перестройки, правка поста ленту сбрасывает."""
+        url = reverse('posts:group_feed', args=['test-slug', 'rss'])
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.create(
+            text='Второй пост', author=self.user, group=self.group
+        )
+        with self.assertNumQueries(0):
+            self.commit()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertEqual(
+            len(ElementTree.fromstring(content).findall('channel/item')), 2
+        )
+        self.assertLess(
+            content.index('Второй пост'), content.index('Первый пост')
+        )
+        post.text = 'Исправленный пост'
+        post.save()
+        # до фиксации лента не сбрасывается
+        self.assertIn('Второй пост', self.client.get(url).content.decode())
+        self.commit()
+        content = self.client.get(url).content.decode()
+        self.assertIn('Исправленный пост', content)
+        self.assertNotIn('Второй пост', content)
+
+    def test_renames_reset_feeds(self):
+        """Новое имя автора и название группы видны во всех лентах,
+        где они указаны."""
+        urls = (
+            reverse('posts:site_feed', args=['rss']),
+            reverse('posts:group_feed', args=['test-slug', 'rss']),
+            reverse('posts:author_feed', args=['auth', 'rss']),
+        )
+        for url in urls:
+            self.client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.last_name = 'Толстой'
+        user.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Проза'
+        group.save()
+        self.commit()
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn('Лев Толстой', content)
+                self.assertIn('Проза', content)
+
+    def test_links_from_site_url(self):
+        """Ссылки в ленте строятся от SITE_URL, а не от хоста
+        и параметров запроса, который её построил."""
+        url = reverse('posts:site_feed', args=['atom'])
+        content = self.client.get(
+            url + '?utm_source=x', HTTP_HOST='127.0.0.1'
+        ).content.decode()
+        self.assertIn(f'href="{settings.SITE_URL}{url}" rel="self"', content)
+        self.assertIn(
+            settings.SITE_URL
+            + reverse('posts:post_detail', args=[self.post.pk]),
+            content
+        )
+        self.assertNotIn('127.0.0.1', content)
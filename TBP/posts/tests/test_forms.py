@@ -86,6 +86,19 @@ class PostURLTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertEqual(Comment.objects.count(), comment_count + 1)
 
+    @override_settings(COMMENT_GROUP_COMMIT=1)
+    def test_comment_group_commit(self):
+        """При групповой фиксации автор сразу видит свой комментарий"""
+        self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 1})
+        )
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': 1}),
+            data={'text': 'Комментарий из пачки'},
+            follow=True
+        )
+        self.assertContains(response, 'Комментарий из пачки')
+
     def test_comment_not_create_guest_client(self):
         """Объект Comment Не создаётся через форму, гостевым клиентом"""
         comment_count = Comment.objects.count()
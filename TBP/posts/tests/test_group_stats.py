@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, Group, GroupStats
+from ..stats import rebuild_group_stats
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='IvanIvanov')
+        cls.user_2 = User.objects.create_user(username='PetrPetrov')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='test-description',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Вторая группа',
+            slug='test-slug-2',
+            description='test-description',
+        )
+
+    def get_stats(self, group):
+        stats = GroupStats.objects.get(group=group)
+        return stats.post_count, stats.active_authors
+
+    def test_stats_follow_create_move_delete(self):
+        """Статистика обновляется при создании, переносе и удалении."""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.user, group=self.group
+        )
+        Post.objects.create(
+            text='Тестовый текст', author=self.user, group=self.group
+        )
+        Post.objects.create(
+            text='Тестовый текст', author=self.user_2, group=self.group
+        )
+        self.assertEqual(self.get_stats(self.group), (3, 2))
+        self.assertEqual(self.get_stats(self.group_2), (0, 0))
+
+        post.group = self.group_2
+        post.save()
+        self.assertEqual(self.get_stats(self.group), (2, 2))
+        self.assertEqual(self.get_stats(self.group_2), (1, 1))
+
+        post.delete()
+        self.assertEqual(self.get_stats(self.group_2), (0, 0))
+        self.assertIsNone(
+            GroupStats.objects.get(group=self.group_2).last_post_at
+        )
+
+    def test_rebuild_matches_incremental(self):
+        """Полный пересчёт даёт те же значения."""
+        for author in (self.user, self.user, self.user_2):
+            Post.objects.create(
+                text='Тестовый текст', author=author, group=self.group
+            )
+        before = self.get_stats(self.group)
+        rebuild_group_stats()
+        self.assertEqual(self.get_stats(self.group), before)
+        self.assertEqual(self.get_stats(self.group_2), (0, 0))
+
+    def test_group_index_single_query(self):
+        """Каталог групп строится без агрегатов по постам."""
+        Post.objects.create(
+            text='Тестовый текст', author=self.user, group=self.group
+        )
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(reverse('posts:group_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj[0].group, self.group)
+        self.assertEqual(page_obj[0].post_count, 1)
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..importer import Importer, read_records, load_checkpoint
+from ..models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='IvanIvanov')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='test-description',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.jsonl')
+        records = [
+            {'type': 'post', 'id': 100, 'author': 'IvanIvanov',
+             'group': 'test-slug', 'text': 'Импортированный пост',
+             'created': '2020-01-01T10:00:00+00:00'},
+            {'type': 'post', 'author': 'PetrPetrov', 'text': 'Пост'},
+            {'type': 'comment', 'post': 100, 'author': 'PetrPetrov',
+             'text': 'Комментарий'},
+            {'type': 'follow', 'user': 'PetrPetrov', 'author': 'IvanIvanov'},
+        ]
+        with open(self.path, 'w', encoding='utf-8') as data:
+            for record in records:
+                data.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_import_in_batches(self):
+        """Записи импортируются пачками с сохранением id и дат."""
+        importer = Importer(
+            batch_size=2, create_missing=True,
+            checkpoint_path=self.path + '.checkpoint'
+        )
+        imported, skipped = importer.run(read_records(self.path))
+        self.assertEqual((imported, skipped), (4, 0))
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.created.year, 2020)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(Follow.objects.filter(author=self.user).exists())
+        self.assertEqual(load_checkpoint(self.path + '.checkpoint'), 4)
+
+    def test_reimport_skips_loaded_rows(self):
+        """Повторный импорт не создаёт уже загруженные посты,
+        комментарии и подписки."""
+        Importer(create_missing=True).run(read_records(self.path))
+        counts = [
+            model.objects.count() for model in (Post, Comment, Follow)
+        ]
+        importer = Importer(create_missing=True)
+        imported, skipped = importer.run(read_records(self.path))
+        self.assertEqual(importer.duplicates, 4)
+        self.assertEqual((imported, skipped), (0, 4))
+        self.assertEqual(
+            [model.objects.count() for model in (Post, Comment, Follow)],
+            counts
+        )
+
+    def test_unknown_author_skipped(self):
+        """Без --create-missing записи неизвестных авторов пропускаются."""
+        imported, skipped = Importer().run(read_records(self.path))
+        self.assertEqual((imported, skipped), (1, 3))
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается с контрольной точки."""
+        importer = Importer(create_missing=True)
+        importer.run(read_records(self.path), resume_from=3)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertFalse(Post.objects.exists())
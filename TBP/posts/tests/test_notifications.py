@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from .. import notifications
+from ..models import DigestProgress, Post, Follow
+from ..notifications import send_follower_digests
+
+User = get_user_model()
+
+
+class FollowerDigestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_1 = User.objects.create_user(username='IvanIvanov')
+        cls.author_2 = User.objects.create_user(username='PetrPetrov')
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@mail.ru'
+        )
+        cls.no_email = User.objects.create_user(username='no_email')
+        for author in (cls.author_1, cls.author_2):
+            Follow.objects.create(user=cls.reader, author=author)
+            Follow.objects.create(user=cls.no_email, author=author)
+        for author in (cls.author_1, cls.author_1, cls.author_2):
+            Post.objects.create(text='Тестовый текст', author=author)
+
+    def test_one_digest_per_recipient(self):
+        """Все новые посты подписок приходят одним письмом."""
+        sent, posts_count, _ = send_follower_digests()
+        self.assertEqual((sent, posts_count), (1, 3))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@mail.ru'])
+        self.assertEqual(mail.outbox[0].body.count('/posts/'), 3)
+
+    def test_posts_notified_once(self):
+        """Повторная рассылка не отправляет те же посты."""
+        send_follower_digests()
+        sent, posts_count, _ = send_follower_digests()
+        self.assertEqual((sent, posts_count), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(NOTIFY_BATCH_SIZE=1)
+    def test_retry_resumes_after_sent_batches(self):
+        """Повтор упавшей рассылки не шлёт письма уже обработанным
+        пачкам."""
+        reader_2 = User.objects.create_user(
+            username='reader_2', email='reader_2@mail.ru'
+        )
+        Follow.objects.create(user=reader_2, author=self.author_1)
+        send_batch = notifications.send_batch
+        calls = []
+
+        def fail_second(batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise ConnectionError
+            return send_batch(batch)
+
+        with mock.patch.object(notifications, 'send_batch', fail_second):
+            with self.assertRaises(ConnectionError):
+                send_follower_digests()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(DigestProgress.objects.exists())
+        sent, posts_count, _ = send_follower_digests()
+        self.assertEqual((sent, posts_count), (1, 3))
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['reader@mail.ru'], ['reader_2@mail.ru']]
+        )
+        self.assertFalse(DigestProgress.objects.exists())
+        self.assertFalse(
+            Post.objects.filter(followers_notified=False).exists()
+        )
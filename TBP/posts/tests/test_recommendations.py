@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, Group, Follow, FollowRecommendations
+from ..recommendations import recommended_authors
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'fan_1', 'fan_2', 'poet', 'critic',
+                         'novelist', 'stranger', 'newcomer')
+        }
+        follows = {
+            'reader': ['poet'],
+            'fan_1': ['poet', 'critic'],
+            'fan_2': ['poet', 'critic'],
+            'stranger': ['critic', 'novelist'],
+            'newcomer': [],
+        }
+        for user, authors in follows.items():
+            for author in authors:
+                Follow.objects.create(
+                    user=cls.users[user], author=cls.users[author]
+                )
+        group = Group.objects.create(title='Стихи', slug='poems')
+        for author in ('poet', 'novelist'):
+            Post.objects.create(
+                text='-', author=cls.users[author], group=group
+            )
+        call_command('recommend_follows', stdout=StringIO())
+
+    def names(self, user):
+        return [
+            author.username
+            for author in recommended_authors(self.users[user], 10)
+        ]
+
+    def test_recommendations(self):
+        """Сначала авторы с общими подписчиками, затем авторы групп,
+        без уже читаемых; новичкам — популярные авторы."""
+        self.assertEqual(self.names('reader'), ['critic', 'novelist'])
+        self.assertEqual(self.names('newcomer'), ['poet', 'critic',
+                                                  'novelist'])
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['critic']
+        )
+        self.assertEqual(self.names('reader'), ['novelist'])
+
+    def test_follow_index_shows_recommendations(self):
+        self.client.force_login(self.users['reader'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [author.username for author in response.context['recommended']],
+            ['critic', 'novelist']
+        )
+
+    def test_recount_replaces_rows(self):
+        """Пересчёт обновляет строки и удаляет лишние."""
+        FollowRecommendations.objects.create(
+            user_id=self.users['novelist'].pk, authors=b''
+        )
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['critic']
+        )
+        call_command('recommend_follows', stdout=StringIO())
+        self.assertFalse(FollowRecommendations.objects.filter(
+            user_id=self.users['novelist'].pk
+        ).exists())
+        self.assertEqual(self.names('reader'), ['novelist'])
+        self.assertEqual(FollowRecommendations.objects.count(), 5)
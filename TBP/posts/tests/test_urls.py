@@ -1,5 +1,6 @@
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from ..models import Post, Group
@@ -29,6 +30,9 @@ class PostURLTests(TestCase):
             group=cls.group,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_posts_pages_exists_guest_client(self):
         """Страницы сайта доступны любому пользователю."""
         url_status_dict = {
@@ -1,7 +1,7 @@
 import shutil
 import tempfile
 from django.contrib.auth import get_user_model
-# from django.core.cache import cache
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django import forms
 from django.test import TestCase, Client, override_settings
@@ -73,6 +73,9 @@ class PostURLTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
         super().tearDownClass()
 
+    def setUp(self):
+        cache.clear()
+
     def check_post_field(self, post_from_context: Post):
         """Функция проверки полей объекта Post"""
         self.assertEqual(post_from_context.text, self.post.text)
@@ -110,6 +113,13 @@ class PostURLTests(TestCase):
         post_form_context = response.context['page_obj'][0]
         self.check_post_field(post_form_context)
 
+    def test_feed_defers_full_text(self):
+        """Лента не загружает полный текст постов."""
+        response = self.guest_client.get(reverse('posts:index'))
+        post_from_context = response.context['page_obj'][0]
+        self.assertIn('text', post_from_context.get_deferred_fields())
+        self.assertEqual(post_from_context.excerpt, self.post.text)
+
     def test_group_list_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
         response = self.guest_client.get(
@@ -229,12 +239,76 @@ class PostURLTests(TestCase):
         count_follow_obj_after = Follow.objects.count()
         self.assertEqual(count_follow_obj_after, count_follow_obj_before - 1)
 
-    # def test_index_cache(self):
-    #     """Кэширование страницы index.html работает корректно"""
-    #     response = self.guest_client.get(reverse('posts:index'))
-    #     Post.objects.get(id=1).delete()
-    #     new_response = self.guest_client.get(reverse('posts:index'))
-    #     self.assertEqual(response.content, new_response.content)
-    #     cache.clear()
-    #     new_response = self.guest_client.get(reverse('posts:index'))
-    #     self.assertNotEqual(response.content, new_response.content)
+    def test_index_cache(self):
+        """Страница index.html берётся из кэша до появления нового поста"""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        new_response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(new_response['X-Page-Cache'], 'hit')
+        self.assertEqual(response.content, new_response.content)
+        Post.objects.create(text='Новый пост', author=self.user)
+        new_response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(new_response['X-Page-Cache'], 'miss')
+        self.assertContains(new_response, 'Новый пост')
+
+    def test_page_cache_key(self):
+        """Посторонние параметры не создают новых копий страницы,
+        номера за концом ленты не кэшируются"""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        response = self.guest_client.get(url + '?utm_source=x&page=abc')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        for _ in range(2):
+            response = self.guest_client.get(url + '?page=999')
+            self.assertNotIn('X-Page-Cache', response)
+            self.assertContains(response, self.post.text)
+
+    def test_shared_page_personalized(self):
+        """Общая копия страницы дополняется данными пользователя"""
+        url = reverse('posts:profile', kwargs={'username': 'IvanIvanov'})
+        response = self.authorized_client_2.get(url)
+        self.assertContains(response, 'Отписаться')
+        self.assertContains(response, 'Пользователь: PetrPetrov')
+        response = self.authorized_client_2.get(reverse('posts:index'))
+        self.assertContains(response, 'Избранные авторы')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, 'Избранные авторы')
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+        self.assertNotContains(response, 'Пользователь:')
+
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.id})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.authorized_client_2.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    @override_settings(STREAM_PAGES=True)
+    def test_streamed_pages(self):
+        """Потоковые страницы совпадают с обычными и попадают в кэш"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.id})
+        response = self.authorized_client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('csrftoken', response.cookies)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(self.comment.text, content)
+        self.assertIn(edit_url, content)
+        self.assertIn('Пользователь: IvanIvanov', content)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, self.comment.text)
+        self.assertNotContains(response, edit_url)
+        response = self.guest_client.get(reverse('posts:index'))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(self.post.excerpt, content)
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..management.commands.warm_cache import (
+    hot_authors, hot_groups, hot_urls
+)
+from ..models import Post, Group, Follow
+
+User = get_user_model()
+
+
+class WarmCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='IvanIvanov')
+        cls.user_2 = User.objects.create_user(username='PetrPetrov')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='test-description',
+        )
+        Post.objects.create(
+            text='Тестовый текст', author=cls.user, group=cls.group
+        )
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+
+    def test_hot_urls(self):
+        """В прогрев попадают главная, активные группы и популярные
+        авторы."""
+        groups = hot_groups(1)
+        authors = hot_authors(1)
+        self.assertEqual(groups, [(self.group.pk, 'test-slug')])
+        self.assertEqual(authors, [(self.user.pk, 'IvanIvanov')])
+        self.assertEqual(hot_urls(2, groups, authors), [
+            '/', '/?page=2', '/group/',
+            '/group/test-slug/', '/group/test-slug/?page=2',
+            '/profile/IvanIvanov/', '/profile/IvanIvanov/?page=2',
+        ])
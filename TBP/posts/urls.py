@@ -8,7 +8,20 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.post_create, name='create_post'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('feed/<str:fmt>/', views.site_feed, name='site_feed'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/feed/<str:fmt>/',
+        views.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:fmt>/',
+        views.author_feed,
+        name='author_feed'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -1,10 +1,22 @@
 from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 
-from .models import Post, Group, User, Follow
+from core.cache import get_cache_version
+from core.page_cache import shared_page
+from core.paginator import WindowedPaginator
+from core.streaming import render_items
+from core.tasks import enqueue
+from .autocomplete import index as autocomplete_index
+from .comments import save_comment
+from .feeds import feed_response
+from .recommendations import recommended_authors
+from .archive import PostsWithArchive, get_post_or_archived
+from .models import Post, Group, User, Follow, ArchivedPost, GroupStats
 from .forms import PostForm, CommentForm
+from .tasks import post_saved, follow_changed
 
 
 @login_required
@@ -18,9 +30,13 @@ def post_create(request):
             text = form.cleaned_data['text']
             group = form.cleaned_data['group']
             image = form.cleaned_data['image']
-            Post.objects.create(
-                text=text, group=group, author=request.user, image=image
-            )
+            with transaction.atomic():
+                post = Post.objects.create(
+                    text=text, group=group, author=request.user, image=image
+                )
+                enqueue(
+                    post_saved, post.pk, dedupe_key=f'post_saved:{post.pk}'
+                )
             return redirect(f'/profile/{request.user.username}/')
         return render(request, template, context)
     return render(request, template, context)
@@ -43,7 +59,11 @@ def post_edit(request, post_id):
         return render(request, template, context)
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                enqueue(
+                    post_saved, post.pk, dedupe_key=f'post_saved:{post.pk}'
+                )
             return redirect(f'/posts/{post_id}/')
         return render(request, template, context)
     return redirect(f'/posts/{post_id}/')
@@ -58,77 +78,183 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        save_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def group_scope(slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return None if group_id is None else f'group:{group_id}'
+
+
+def author_scope(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return None if author_id is None else f'author:{author_id}'
+
+
+def site_feed(request, fmt):
+    """Лента RSS или Atom всего сайта"""
+    return feed_response(request, 'site', fmt)
+
+
+def group_feed(request, slug, fmt):
+    """Лента RSS или Atom группы"""
+    scope = group_scope(slug)
+    if scope is None:
+        raise Http404
+    return feed_response(request, scope, fmt)
+
+
+def author_feed(request, username, fmt):
+    """Лента RSS или Atom автора"""
+    scope = author_scope(username)
+    if scope is None:
+        raise Http404
+    return feed_response(request, scope, fmt)
+
+
+@shared_page('feed')
 def index(request):
     """Главная страница"""
-    post_list = Post.objects.all()
-    page_obj = create_page_obj(post_list, request)
+    post_list = Post.objects.for_feed()
+    page_obj = create_page_obj(post_list, request, count_scope='feed')
     template = 'posts/index.html'
     context = {'page_obj': page_obj}
-    return render(request, template, context)
+    return render_feed(
+        request, template, context, page_obj,
+        show_group_link=True, show_profile_link=True
+    )
 
 
+@shared_page(group_scope)
 def group_posts(request, slug):
     """Все посты выбранной группы"""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = create_page_obj(posts, request)
+    posts = group.posts.for_feed()
+    page_obj = create_page_obj(
+        posts, request, count_scope=f'group:{group.pk}'
+    )
     template = 'posts/group_list.html'
     context = {
         'group': group,
         'page_obj': page_obj,
     }
+    return render_feed(
+        request, template, context, page_obj,
+        show_group_link=False, show_profile_link=True
+    )
+
+
+def group_index(request):
+    """Каталог групп"""
+    stats = GroupStats.objects.select_related('group').order_by(
+        '-last_post_at'
+    )
+    page_obj = create_page_obj(stats, request)
+    template = 'posts/group_index.html'
+    context = {'page_obj': page_obj}
     return render(request, template, context)
 
 
+def autocomplete(request):
+    """Авторы и группы по началу имени: ?q=префикс"""
+    results = [
+        {'kind': item['kind'], 'label': item['label'], 'url': item['url']}
+        for item in autocomplete_index.lookup(request.GET.get('q', ''))
+    ]
+    return JsonResponse({'results': results})
+
+
+@shared_page(author_scope)
 def profile(request, username):
     """Все посты выбранного автора"""
     user = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=user)
-    page_obj = create_page_obj(post_list, request)
-    following = Follow.objects.filter(user=request.user.id).filter(author=user)
+    post_list = PostsWithArchive(
+        Post.objects.filter(author=user).for_feed(),
+        ArchivedPost.objects.filter(author=user).for_feed(),
+    )
+    page_obj = create_page_obj(
+        post_list, request, count_scope=f'author:{user.pk}'
+    )
     template = 'posts/profile.html'
     context = {
         'author': user,
         'page_obj': page_obj,
-        'following': following,
     }
-    return render(request, template, context)
+    return render_feed(
+        request, template, context, page_obj,
+        show_group_link=True, show_profile_link=False
+    )
 
 
+@shared_page('post:{post_id}')
 def post_detail(request, post_id):
     """Подробная информация о посте"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_archived(post_id)
     template = 'posts/post_detail.html'
-    form = CommentForm()
     comments = post.comments.select_related('author')
     context = {
         'post': post,
-        'form': form,
-        'comments': comments
+        'archived': isinstance(post, ArchivedPost),
     }
-    return render(request, template, context)
+    return render_items(
+        request, template, context, 'comments', comments,
+        'includes/comment.html', 'comment'
+    )
+
 
+def create_page_obj(posts, request, count_scope=None):
+    """Пагинатор, создаваемый из листа постов.
 
-def create_page_obj(posts, request):
-    """Пагинатор, создаваемый из листа постов"""
-    paginator = Paginator(posts, settings.POSTS_IN_PAGE)
+    Если указана область кэша count_scope, общее число постов берётся
+    из кэша и обновляется при смене версии области.
+    """
+    count_key = None
+    if count_scope is not None:
+        version = get_cache_version(count_scope)
+        count_key = f'count:{count_scope}:{version}'
+    paginator = WindowedPaginator(
+        posts, settings.POSTS_IN_PAGE, count_key=count_key
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    # номер показанной страницы для общего кэша страниц
+    request.page_number = page_obj.number
     return page_obj
 
 
+def render_feed(request, template, context, page_obj, **item_context):
+    """Рендер ленты: посты страницы выводятся шаблоном post_frame."""
+    return render_items(
+        request, template, context, 'posts', page_obj,
+        'includes/post_frame.html', 'post', item_context
+    )
+
+
 @login_required
 def follow_index(request):
     """Страница постов авторов на которых подписан пользователь"""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = create_page_obj(post_list, request)
+    post_list = Post.objects.filter(
+        author__following__user=request.user
+    ).for_feed()
+    page_obj = create_page_obj(
+        post_list, request, count_scope=f'follow:{request.user.pk}'
+    )
     template = 'posts/follow.html'
-    context = {'page_obj': page_obj}
-    return render(request, template, context)
+    context = {
+        'page_obj': page_obj,
+        'recommended': recommended_authors(
+            request.user, settings.RECOMMEND_SHOWN
+        ),
+    }
+    return render_feed(
+        request, template, context, page_obj,
+        show_group_link=True, show_profile_link=True
+    )
 
 
 @login_required
@@ -136,7 +262,12 @@ def profile_follow(request, username):
     """Подписка пользователя на автора"""
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(
+                user=request.user, author=author
+            )
+            if created:
+                enqueue(follow_changed, request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
 
 
@@ -144,5 +275,7 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     """Отписка пользователя на автора"""
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.get(user=request.user, author=author).delete()
+        enqueue(follow_changed, request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
@@ -11,12 +11,80 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()  # загрузить переменные окружения из файла .env
 
 POSTS_IN_PAGE = 3
 
+# сколько номеров страниц показывать по обе стороны от текущей
+PAGINATOR_ON_EACH_SIDE = 2
+
+# сколько секунд хранить в кэше число постов ленты
+PAGINATOR_COUNT_TIMEOUT = 60
+
+# Автодополнение авторов и групп (posts.autocomplete)
+# сколько вариантов возвращать
+AUTOCOMPLETE_LIMIT = 10
+# как часто (в секундах) проверять, не изменились ли данные
+# в другом процессе
+AUTOCOMPLETE_CHECK_INTERVAL = 1
+# не реже чем раз в столько секунд индекс перестраивается целиком
+AUTOCOMPLETE_MAX_AGE = 300
+
+# Ленты RSS и Atom (posts.feeds)
+# сколько последних постов в ленте
+FEED_ITEMS = 20
+# сколько секунд хранить готовую ленту; изменения сбрасывают её сразу
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Рекомендации авторов (posts.recommendations, recommend_follows)
+# сколько авторов хранить для каждого читателя
+RECOMMEND_AUTHORS = 10
+# сколько показывать на странице подписок
+RECOMMEND_SHOWN = 5
+# сколько похожих авторов учитывать для каждого автора
+RECOMMEND_NEIGHBOURS = 50
+# сколько подписок одного читателя учитывать при подсчёте похожести
+RECOMMEND_MAX_FOLLOWS = 200
+# вес авторов из групп читаемых авторов относительно похожести
+RECOMMEND_GROUP_WEIGHT = 0.5
+
+# Групповая фиксация комментариев (posts.comments): комментарии,
+# пришедшие в процесс почти одновременно, пишутся одной транзакцией
+COMMENT_GROUP_COMMIT = int(os.environ.get("COMMENT_GROUP_COMMIT", default=0))
+# сколько секунд ждать других комментариев в пачку
+COMMENT_BATCH_DELAY = 0.01
+# пачка пишется сразу, как только в ней столько комментариев
+COMMENT_BATCH_SIZE = 100
+
+# сколько секунд хранить общую для всех пользователей копию страницы
+# (0 — не кэшировать страницы)
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", default=60))
+
+# отдавать ленты и страницы постов потоково (core.streaming): шапка
+# страницы уходит клиенту до выборки и рендера постов и комментариев
+STREAM_PAGES = int(os.environ.get("STREAM_PAGES", default=0))
+# сколько строк выборки читать из курсора за раз при потоковом рендере
+STREAM_CHUNK_SIZE = 100
+
+# Защита от одновременного пересчёта кэша (core.cache.single_flight)
+# на сколько секунд воркер блокирует пересчёт одного ключа
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+# сколько секунд остальные ждут результат, если устаревшей копии нет
+SINGLE_FLIGHT_WAIT = 2
+# как часто они проверяют кэш во время ожидания
+SINGLE_FLIGHT_POLL = 0.05
+# сколько секунд хранится устаревшая копия для отдачи во время пересчёта
+SINGLE_FLIGHT_STALE_TIMEOUT = 60 * 60
+
+# посты старше этого числа дней переносятся в архив (archive_posts)
+ARCHIVE_AFTER_DAYS = 365 * 2
+
+# размер пачки для массовых действий в админке
+ADMIN_BATCH_SIZE = 1000
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -56,11 +124,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiler.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -143,26 +215,126 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# имена файлов с хэшем содержимого и сжатые копии .gz/.br
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# раздавать статику из STATIC_ROOT силами Django (без nginx)
+SERVE_STATIC = int(os.environ.get("SERVE_STATIC", default=0))
+
+# срок кэширования статики с хэшем в имени, в секундах
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
+# ответы меньше этого размера (в байтах) не сжимаются
+COMPRESS_MIN_SIZE = 1024
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# как отдавать MEDIA_ROOT (core.views.media_serve):
+# '' — не отдавать силами Django (при DEBUG отдаёт django.conf.urls.static),
+# 'django' — FileResponse с поддержкой Range и ETag,
+# 'x-accel' — передать nginx заголовком X-Accel-Redirect,
+# 'x-sendfile' — передать Apache или lighttpd заголовком X-Sendfile
+MEDIA_SERVE = os.environ.get("MEDIA_SERVE", default="")
+# internal location nginx, указывающий на MEDIA_ROOT:
+#     location /protected-media/ { internal; alias /path/to/media/; }
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# срок кэширования загруженных картинок, в секундах (миниатюры
+# кэшируются на STATIC_MAX_AGE)
+MEDIA_MAX_AGE = 60 * 60 * 24
+
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
-#
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-#     }
-# }
+
+# адрес сайта для ссылок в письмах и лентах RSS/Atom
+SITE_URL = os.environ.get("SITE_URL", default="http://localhost:8000")
+
+# Дайджесты новых постов для подписчиков (posts.notifications)
+# сколько секунд копить новые посты перед рассылкой
+NOTIFY_DIGEST_DELAY = 300
+# получателей в одной пачке (одно SMTP-соединение на пачку)
+NOTIFY_BATCH_SIZE = 500
+# постов в одном проходе рассылки
+NOTIFY_MAX_POSTS = 1000
+# посты старше этого возраста (в секундах) в дайджест не попадают
+NOTIFY_MAX_AGE = 60 * 60 * 24
+
+# Кэш. LocMemCache у каждого процесса свой: версии кэша (core.cache),
+# которые поднимают воркер задач и другие процессы сервера, до процесса
+# не доходят, и страницы, ленты, счётчики и автодополнение остаются
+# устаревшими. При нескольких процессах (gunicorn, run_tasks) задайте
+# общий кэш, например memcached:
+# CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# CACHE_LOCATION=127.0.0.1:11211
+# или файловый на одном сервере:
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CACHE_LOCATION=/var/tmp/tbp_cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        'BACKEND': os.environ.get(
+            "CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get("CACHE_LOCATION", default=''),
     }
 }
 
+# Фоновая очередь задач (core.tasks). Задачи выполняет воркер
+# python manage.py run_tasks; без него и без TASKS_EAGER миниатюры
+# и дайджесты не создаются.
+# выполнять задачи сразу после коммита, без воркера
+TASKS_EAGER = int(os.environ.get("TASKS_EAGER", default=0))
+# через сколько секунд задача в статусе running считается зависшей
+TASKS_TIMEOUT = 600
+# базовая задержка повтора упавшей задачи, удваивается с каждой попыткой
+TASKS_RETRY_DELAY = 10
+# сколько дней хранить выполненные задачи и задачи с ошибкой
+TASKS_KEEP_DONE_DAYS = 7
+TASKS_KEEP_FAILED_DAYS = 30
+
+# Метрики запросов (core.metrics), отдаются на /metrics
+# каталог, куда каждый процесс сбрасывает свои счётчики
+METRICS_DIR = os.environ.get(
+    "METRICS_DIR",
+    default=os.path.join(tempfile.gettempdir(), 'tbp_metrics')
+)
+# как часто (в секундах) процесс сбрасывает счётчики на диск
+METRICS_FLUSH_INTERVAL = 5
+# границы корзин гистограммы времени ответа, в секундах
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# с каких адресов доступен /metrics
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# прогревать процесс при импорте tbp.wsgi: URL, шаблоны, sorl-thumbnail
+# (core.warmup; вместе с gunicorn --preload)
+WARM_START = int(os.environ.get("WARM_START", default=0))
+
+# Профилирование запросов (core.profiler, python manage.py profile_report)
+# куда сохранять профили
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR",
+    default=os.path.join(tempfile.gettempdir(), 'tbp_profiles')
+)
+# доля случайно профилируемых запросов (0 — только по запросу)
+PROFILE_SAMPLE_RATE = float(
+    os.environ.get("PROFILE_SAMPLE_RATE", default=0)
+)
+# интервал между снимками стека, в секундах
+PROFILE_INTERVAL = 0.005
+# сколько секунд действует значение заголовка X-Profile
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+
+# SQL-запросы дольше этого времени (в секундах) попадают в журнал
+# медленных запросов (python manage.py slow_queries)
+SLOW_QUERY_THRESHOLD = float(
+    os.environ.get("SLOW_QUERY_THRESHOLD", default=0.1)
+)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
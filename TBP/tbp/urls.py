@@ -1,8 +1,10 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -13,13 +15,27 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
+if settings.SERVE_STATIC:
+    from core.views import static_serve
+
+    urlpatterns += (
+        re_path(r'^static/(?P<path>.*)$', static_serve),)
+
+if settings.MEDIA_SERVE:
+    from core.views import media_serve
+
+    urlpatterns += (
+        re_path(r'^media/(?P<path>.*)$', media_serve),)
+
 if settings.DEBUG:
     import debug_toolbar
 
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+    if not settings.MEDIA_SERVE:
+        urlpatterns += static(
+            settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+        )
     urlpatterns += (
         path('__debug__/', include(debug_toolbar.urls)),)
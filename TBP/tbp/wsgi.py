@@ -1,5 +1,5 @@
 """
-WSGI config for yatube project.
+WSGI config for tbp project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
@@ -8,9 +8,23 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+started = time.perf_counter()
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tbp.settings')
 
 application = get_wsgi_application()
+
+# время настройки Django, для python manage.py startup_report
+setup_duration = time.perf_counter() - started
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_START:
+    # прогрев до форка воркеров (gunicorn --preload), см. core.warmup
+    from core.warmup import warm_up  # noqa: E402
+
+    warmup_report = warm_up()